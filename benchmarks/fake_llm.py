@@ -0,0 +1,68 @@
+import asyncio
+import itertools
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+# roughly what a tokenizer does to the turn_into_logic format: words, punctuation, whitespace runs
+_TOKEN = re.compile(r"\s+|\w+|[^\w\s]")
+
+
+def split_tokens(text: str) -> list:
+    return _TOKEN.findall(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic local stand-in for the Ollama chat model.
+    Replays `outputs` (turn_into_logic formatted texts) in order, cycling
+    when they run out, and streams them token by token:
+    - first_token_latency: seconds before the first token (prompt evaluation)
+    - token_latency: seconds between tokens (decoding)
+    With both at 0 only the pipeline around the model is measured.
+    """
+
+    outputs: List[str]
+    token_latency: float = 0.0
+    first_token_latency: float = 0.0
+
+    _counter: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-logic"
+
+    def _next_output(self) -> str:
+        return self.outputs[next(self._counter) % len(self.outputs)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        text = "".join(chunk.message.content for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.first_token_latency:
+            time.sleep(self.first_token_latency)
+        for index, token in enumerate(split_tokens(self._next_output())):
+            if index and self.token_latency:
+                time.sleep(self.token_latency)
+            if run_manager is not None:
+                run_manager.on_llm_new_token(token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs):
+        if self.first_token_latency:
+            await asyncio.sleep(self.first_token_latency)
+        for index, token in enumerate(split_tokens(self._next_output())):
+            if index and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
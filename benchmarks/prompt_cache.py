@@ -0,0 +1,130 @@
+"""
+Prompt-eval cost of the legacy prompt layout vs PromptAssembler.
+
+    python -m benchmarks.prompt_cache --host http://localhost:11434 --model qwen2.5:7b --turns 20
+
+Both layouts replay the same conversation against a live Ollama /api/chat.
+Generation is cut to one token, so each request costs about its prompt
+evaluation. The report reads prompt_eval_count and prompt_eval_duration of
+every turn; Ollama only counts the tokens it did not find in its KV cache.
+It also reports the prefix each prompt shares with the previous one.
+--offline skips the requests and reports only the shared prefixes.
+"""
+import argparse
+import http.client
+import json
+import os
+from urllib.parse import urlparse
+
+from benchmarks.workload import make_definitions, make_turns
+from modules.app_tools import turn_into_logic
+from modules.database import Database
+from modules.definition_parser import iter_definitions
+from modules.prompt_assembler import PromptAssembler
+
+
+def legacy_render(statement: str, db: Database) -> str:
+    return str(db.get_relevant_records(statement)) + statement
+
+
+def common_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def chat(connection, model: str, system: str, user: str) -> dict:
+    body = json.dumps({
+        "model": model,
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+        "stream": False,
+        "options": {"temperature": 0, "num_predict": 1},
+    })
+    connection.request("POST", "/api/chat", body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    data = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"ollama returned {response.status}: {data}")
+    return data
+
+
+# one conversation in one layout; the knowledge base grows by each turn's canned definitions
+def replay(layout: str, args, connection=None) -> dict:
+    system = turn_into_logic()
+    statements, outputs = make_turns(args.turns, args.seed)
+    db = Database()
+    db.add_definitions(make_definitions(args.kb_size, args.seed))
+    assembler = PromptAssembler(token_budget=args.token_budget)
+
+    turns = []
+    previous = None
+    for statement, output in zip(statements, outputs):
+        user = assembler.render(statement, db) if layout == "assembled" else legacy_render(statement, db)
+        prompt = system + user
+        turn = {"prompt_chars": len(prompt),
+                "shared_prefix_chars": common_prefix(previous, prompt) if previous is not None else 0}
+        if connection is not None:
+            data = chat(connection, args.model, system, user)
+            turn["prompt_eval_count"] = data.get("prompt_eval_count", 0)
+            turn["prompt_eval_seconds"] = data.get("prompt_eval_duration", 0) / 1e9
+        turns.append(turn)
+        previous = prompt
+        db.add_definitions(dict(iter_definitions(output)))
+
+    summary = {
+        "turns": turns,
+        "mean_shared_prefix_ratio": sum(t["shared_prefix_chars"] / t["prompt_chars"] for t in turns[1:])
+        / max(1, len(turns) - 1),
+    }
+    if connection is not None:
+        # the first turn is a cold start for both layouts
+        warm = turns[1:] or turns
+        summary["mean_prompt_eval_count"] = sum(t["prompt_eval_count"] for t in warm) / len(warm)
+        summary["mean_prompt_eval_seconds"] = sum(t["prompt_eval_seconds"] for t in warm) / len(warm)
+    if layout == "assembled":
+        summary["rebases"] = assembler.rebases
+    return summary
+
+
+def run(args) -> dict:
+    connection = None
+    if not args.offline:
+        url = urlparse(args.host)
+        connection = http.client.HTTPConnection(url.hostname, url.port or 11434, timeout=args.timeout)
+    try:
+        report = {"parameters": vars(args)}
+        for layout in ("legacy", "assembled"):
+            report[layout] = replay(layout, args, connection)
+        if connection is not None and report["legacy"]["mean_prompt_eval_seconds"]:
+            report["prompt_eval_speedup"] = (report["legacy"]["mean_prompt_eval_seconds"]
+                                             / max(report["assembled"]["mean_prompt_eval_seconds"], 1e-9))
+        return report
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("OLLAMA_HOST", "http://localhost:11434"))
+    parser.add_argument("--model", default="qwen2.5:7b")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--kb-size", type=int, default=1000, help="definitions in the knowledge base at the start")
+    parser.add_argument("--token-budget", type=int, default=2048, help="PromptAssembler context budget")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--offline", action="store_true", help="only compare shared prefixes, no requests")
+    parser.add_argument("--output", default="-", help="JSON output file ('-' for stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    text = json.dumps(run(args), indent=2, sort_keys=True)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
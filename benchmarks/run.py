@@ -0,0 +1,228 @@
+"""
+End-to-end benchmarks of the main.py pipeline against a local fake llm.
+
+    python -m benchmarks.run --turns 200 --kb-sizes 10,100,1000,10000,100000 --output bench.json
+
+No Ollama is needed: ModelInterface gets a FakeChatModel that replays canned
+turn_into_logic outputs. Results are written as JSON for regression tracking.
+"""
+import argparse
+import contextlib
+import os
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.workload import make_definitions, make_turns
+from main import process_user_input
+from modules import metrics
+from modules.atom_canonicalizer import AtomCanonicalizer
+from modules.database import Database
+from modules.knowledge_base import KnowledgeSession
+from modules.metrics import Histogram
+from modules.model_interface import ModelInterface
+from modules.prompt_assembler import PromptAssembler
+from modules.rule_formalizer import RuleFormalizer
+from modules.stream_sinks import NullSink
+
+# (object attribute, method) pairs process_user_input goes through, one stage each
+STAGES = {
+    "fastpath": ("formalizer", "formalize"),
+    "assemble": ("assembler", "render"),
+    "model": ("model_interface", "get_result"),
+    "canonicalize": ("canonicalizer", "canonicalize_result"),
+    "store": ("db", "add_definitions"),
+    "encode": ("session", "add_turn"),
+    "solve": ("session", "is_satisfiable"),
+}
+
+
+class Pipeline:
+    """A fresh main.py setup (in-memory database, session, canonicalizer, prompt assembler and
+    rule formalizer) around a fake-llm ModelInterface."""
+
+    def __init__(self, outputs: list, token_latency: float = 0.0, first_token_latency: float = 0.0,
+                 definitions: dict = None):
+        llm = FakeChatModel(outputs=outputs, token_latency=token_latency,
+                            first_token_latency=first_token_latency)
+        self.model_interface = ModelInterface(llm=llm, cache_path=None, sink=NullSink())
+        self.db = Database()
+        if definitions:
+            self.db.add_definitions(definitions)
+        self.session = KnowledgeSession()
+        self.canonicalizer = AtomCanonicalizer(name for name, _ in self.db.iter_records())
+        self.assembler = PromptAssembler()
+        self.formalizer = RuleFormalizer()
+        self.stages = {name: Histogram(1e9) for name in STAGES}
+        for stage, (owner, method) in STAGES.items():
+            self._time(stage, getattr(self, owner), method)
+
+    # shadows obj.method with a wrapper that records its latency under `stage`
+    def _time(self, stage, obj, method):
+        original = getattr(obj, method)
+        histogram = self.stages[stage]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - start)
+
+        setattr(obj, method, timed)
+
+    def turn(self, statement: str):
+        process_user_input(statement, self.model_interface, self.db, self.session, self.canonicalizer,
+                           self.assembler, self.formalizer)
+
+    def stage_summary(self) -> dict:
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+
+
+# turns/sec and per-stage latency over `turns` fresh statements
+def bench_pipeline(turns: int, token_latency: float, first_token_latency: float, seed: int) -> dict:
+    statements, outputs = make_turns(turns, seed)
+    pipeline = Pipeline(outputs, token_latency, first_token_latency)
+    latencies = Histogram(1e9)
+    start = time.perf_counter()
+    for statement in statements:
+        turn_start = time.perf_counter()
+        pipeline.turn(statement)
+        latencies.record(time.perf_counter() - turn_start)
+    elapsed = time.perf_counter() - start
+    return {
+        "turns": turns,
+        "seconds": elapsed,
+        "turns_per_second": turns / elapsed if elapsed else 0.0,
+        "turn_latency_seconds": latencies.summary(),
+        "stage_latency_seconds": pipeline.stage_summary(),
+        "cache": pipeline.model_interface.outputs.stats(),
+        "definitions": len(pipeline.db),
+    }
+
+
+# python heap growth of the pipeline, sampled `samples` times while running `turns` turns
+# (tracemalloc slows python down, so this runs separately from the timing benchmarks)
+def bench_memory(turns: int, samples: int, seed: int) -> dict:
+    statements, outputs = make_turns(turns, seed)
+    tracemalloc.start()
+    try:
+        pipeline = Pipeline(outputs)
+        baseline, _ = tracemalloc.get_traced_memory()
+        every = max(1, turns // samples)
+        points = []
+        for i, statement in enumerate(statements, 1):
+            pipeline.turn(statement)
+            if i % every == 0 or i == turns:
+                current, peak = tracemalloc.get_traced_memory()
+                cache = pipeline.model_interface.outputs.stats()
+                points.append({
+                    "turns": i,
+                    "heap_bytes": current - baseline,
+                    "peak_heap_bytes": peak - baseline,
+                    "definitions": len(pipeline.db),
+                    "cached_outputs": cache["memory_items"],
+                    "cache_disk_bytes": cache["disk_bytes"],
+                })
+    finally:
+        tracemalloc.stop()
+    first, last = points[0], points[-1]
+    growth = (last["heap_bytes"] - first["heap_bytes"]) / max(1, last["turns"] - first["turns"])
+    return {"samples": points, "heap_bytes_per_turn": growth}
+
+
+# cost of context selection and of a whole turn as the knowledge base grows
+def bench_kb_scaling(sizes: list, turns: int, seed: int) -> list:
+    statements, outputs = make_turns(turns, seed + 1)
+    results = []
+    for size in sizes:
+        definitions = make_definitions(size, seed)
+        # heap is measured on a throwaway build, tracemalloc would distort the load time
+        tracemalloc.start()
+        Pipeline(outputs, definitions=definitions)
+        heap_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        load_start = time.perf_counter()
+        pipeline = Pipeline(outputs, definitions=definitions)
+        load_seconds = time.perf_counter() - load_start
+
+        select = Histogram(1e9)
+        for statement in statements:
+            start = time.perf_counter()
+            pipeline.db.get_relevant_records(statement)
+            select.record(time.perf_counter() - start)
+
+        turn = Histogram(1e9)
+        for statement in statements:
+            start = time.perf_counter()
+            pipeline.turn(statement)
+            turn.record(time.perf_counter() - start)
+
+        results.append({
+            "definitions": size,
+            "load_seconds": load_seconds,
+            "heap_bytes": heap_bytes,
+            "select_latency_seconds": select.summary(),
+            "turn_latency_seconds": turn.summary(),
+            "stage_latency_seconds": pipeline.stage_summary(),
+        })
+    return results
+
+
+def run(args) -> dict:
+    metrics.registry.reset()
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": vars(args),
+    }
+    # the pipeline logs every turn; keep the console quiet and the JSON clean
+    # (discarded rather than buffered, a buffer would show up as heap growth)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report["pipeline"] = bench_pipeline(args.turns, args.token_latency, args.first_token_latency, args.seed)
+        report["memory"] = bench_memory(args.memory_turns, args.memory_samples, args.seed)
+        report["kb_scaling"] = bench_kb_scaling(args.kb_sizes, args.kb_turns, args.seed)
+    if resource is not None:
+        report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["metrics"] = metrics.registry.snapshot()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="turns of the throughput benchmark")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake llm seconds per token")
+    parser.add_argument("--first-token-latency", type=float, default=0.0, help="fake llm seconds before the first token")
+    parser.add_argument("--memory-turns", type=int, default=1000, help="turns of the memory benchmark")
+    parser.add_argument("--memory-samples", type=int, default=10, help="memory measurements taken")
+    parser.add_argument("--kb-sizes", type=lambda text: [int(size) for size in text.split(",")],
+                        default=[10, 100, 1000, 10000, 100000], help="comma separated knowledge base sizes")
+    parser.add_argument("--kb-turns", type=int, default=20, help="turns per knowledge base size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="JSON output file ('-' for stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    text = json.dumps(run(args), indent=2, sort_keys=True)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import random
+
+# a small vocabulary so that generated statements and definitions share terms
+# the way real turns do (the relevance index has real work to do)
+SUBJECTS = ["cake", "dessert", "meal", "shop", "bike", "rain", "street", "park", "money", "friend",
+            "coffee", "train", "office", "garden", "dog", "book", "movie", "music", "beach", "school"]
+VERBS = ["eat", "buy", "ride", "visit", "like", "need", "want", "see", "find", "bring"]
+STATES = ["sad", "happy", "tired", "hungry", "wet", "sunny", "late", "busy", "free", "sweet"]
+
+
+def _atom(*words) -> str:
+    return "_".join(word.capitalize() for word in words)
+
+
+# one benchmark turn: the user statement and the canned llm output for it
+# the shapes follow the turn_into_logic examples (conditional, iff, xor, conjunction)
+# atoms carry the turn number so every turn adds new definitions
+def make_turn(i: int, seed: int = 0) -> tuple:
+    rng = random.Random(seed * 1000003 + i)
+    verb, subject, state = rng.choice(VERBS), rng.choice(SUBJECTS), rng.choice(STATES)
+    other = rng.choice(SUBJECTS)
+    a = (_atom(verb, subject, str(i)), f"I {verb} the {subject} (case {i}).")
+    b = (_atom("feel", state, str(i)), f"I feel {state} (case {i}).")
+    c = (_atom("have", other, str(i)), f"I have a {other} (case {i}).")
+
+    shape = i % 4
+    if shape == 0:
+        statement = f"If I {verb} the {subject}, I feel {state}."
+        atoms, expression = (a, b), f"{a[0]} IMPLY {b[0]}"
+    elif shape == 1:
+        statement = f"I {verb} the {subject} if and only if I feel {state} and I have a {other}."
+        atoms = (a, b, c)
+        expression = f"({a[0]} IMPLY ({b[0]} AND {c[0]})) AND (({b[0]} AND {c[0]}) IMPLY {a[0]})"
+    elif shape == 2:
+        statement = f"I {verb} the {subject} or I have a {other}, but not both."
+        atoms = (a, c)
+        expression = f"({a[0]} OR {c[0]}) AND (NOT ({a[0]} AND {c[0]}))"
+    else:
+        statement = f"I {verb} the {subject} and I do not feel {state}."
+        atoms, expression = (a, b), f"{a[0]} AND (NOT {b[0]})"
+
+    # half the turns, of every shape, get a second sentence, which the rule formalizer leaves
+    # to the model (the fake llm replays outputs in order, whichever turn they were made for)
+    if i // 4 % 2:
+        statement += f" It happened on day {i}."
+
+    definitions = "\n".join(f"{name}: {description}" for name, description in atoms)
+    output = f"Definitions:\n{definitions}\nLogic Form Expression:\n{expression}\n"
+    return statement, output
+
+
+def make_turns(count: int, seed: int = 0) -> tuple:
+    turns = [make_turn(i, seed) for i in range(count)]
+    return [statement for statement, _ in turns], [output for _, output in turns]
+
+
+# n synthetic knowledge base definitions (name -> description)
+def make_definitions(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    definitions = {}
+    for i in range(n):
+        verb, subject, state = rng.choice(VERBS), rng.choice(SUBJECTS), rng.choice(STATES)
+        definitions[_atom(verb, subject, "kb", str(i))] = f"I {verb} the {subject} when I am {state} ({i})."
+    return definitions
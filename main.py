@@ -1,31 +1,84 @@
 
 from modules.model_interface import ModelInterface
+from modules.logic_result import MalformedOutputError
 from modules.logger import Logger
 from modules.database import Database
+from modules.knowledge_base import KnowledgeSession
+from modules.atom_canonicalizer import AtomCanonicalizer
+from modules.prompt_assembler import PromptAssembler
+from modules.rule_formalizer import RuleFormalizer
+from modules.sentence_decomposer import SentenceDecomposer
 
-db = Database()
-def process_user_input(user_input: str, model_interface: ModelInterface, db: Database):
-    Logger.log("Model Output: ", end="")
-    user_input = str(db.get_record_list()) + user_input
-    expr = model_interface.get_expression(user_input)
-    defin = model_interface.get_definitions(user_input)
-    db.add_record(defin)
-    print(expr)
+def process_user_input(user_input: str, model_interface: ModelInterface, db: Database,
+                       session: KnowledgeSession = None, canonicalizer: AtomCanonicalizer = None,
+                       assembler: PromptAssembler = None, formalizer: RuleFormalizer = None,
+                       decomposer: SentenceDecomposer = None):
+    # simple statements ("If it rains, the street is wet.") are formalized by rule, without the llm
+    result = formalizer.formalize(user_input) if formalizer is not None else None
+    try:
+        if result is None and decomposer is not None:
+            # sentence by sentence, in parallel, each one cached on its own
+            Logger.log("Sentence Output: ", end="")
+            result = decomposer.formalize(user_input)
+        elif result is None:
+            result = _ask_model(user_input, model_interface, db, assembler)
+        else:
+            Logger.log("Rule Output: ", end="")
+    except MalformedOutputError as error:
+        # one unusable model output skips this turn, not the rest of the conversation
+        Logger.error(f"Could not formalize this statement, skipping it: {error}")
+        return
+    # map near-duplicate atoms (Feels_Sad, I_Feel_Sad, ...) onto the ones we already know
+    if canonicalizer is not None:
+        result = canonicalizer.canonicalize_result(result)
+    db.add_definitions(result.definitions)
+    print(result.expression)
+    # the session only encodes this turn's formula, earlier turns are not re-solved
+    # a contradicting turn is retracted again, so it does not taint the turns after it
+    if session is not None:
+        turn_id = session.add_turn([result.formula])
+        if not session.is_satisfiable():
+            session.retract(turn_id)
+            Logger.warn("This statement contradicts the knowledge base and was not added to it.")
     Logger.log()
 
-def main():
+def _ask_model(user_input: str, model_interface: ModelInterface, db: Database,
+               assembler: PromptAssembler = None):
+    Logger.log("Model Output: ", end="")
+    # the assembler keeps the prompt prefix stable between turns (model server KV-cache reuse)
+    if assembler is not None:
+        user_input = assembler.render(user_input, db)
+    else:
+        user_input = str(db.get_relevant_records(user_input)) + user_input
+    # definitions are stored by the caller once the output has parsed, so a malformed
+    # output (MalformedOutputError) leaves nothing behind in the database
+    return model_interface.get_result(user_input)
+
+# split_sentences formalizes every sentence on its own (see modules.sentence_decomposer)
+def main(split_sentences: bool = False):
     model_interface = ModelInterface()
+    db = Database("data/knowledge.db")
+    session = KnowledgeSession()
+    canonicalizer = AtomCanonicalizer(name for name, _ in db.iter_records())
+    assembler = PromptAssembler()
+    formalizer = RuleFormalizer()
+    decomposer = SentenceDecomposer(model_interface, formalizer) if split_sentences else None
     
     user_input = """I love cake. A cake is a type of dessert. Desserts are typically sweet foods eaten after a meal."""
-    process_user_input(user_input, model_interface, db)
+    process_user_input(user_input, model_interface, db, session, canonicalizer, assembler, formalizer,
+                       decomposer)
     user_input = """If I dont eat cake after a meal, I feel sad. I go cycling to the shop to buy something sweet."""
-    process_user_input(user_input, model_interface, db)
+    process_user_input(user_input, model_interface, db, session, canonicalizer, assembler, formalizer,
+                       decomposer)
     user_input = """If what I eat after a meal is not sweet, I feel sad."""
-    process_user_input(user_input, model_interface, db)
+    process_user_input(user_input, model_interface, db, session, canonicalizer, assembler, formalizer,
+                       decomposer)
     user_input = """I feel sad. That means I should eat cake."""
-    process_user_input(user_input, model_interface, db)
+    process_user_input(user_input, model_interface, db, session, canonicalizer, assembler, formalizer,
+                       decomposer)
     user_input = """Cycling makes me want to eat cake. I have money , so i should go buy cake"""
-    process_user_input(user_input, model_interface, db)
+    process_user_input(user_input, model_interface, db, session, canonicalizer, assembler, formalizer,
+                       decomposer)
     
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+import itertools
+import math
+import re
+from collections import defaultdict
+
+from modules.logic_result import LogicResult
+
+# copulas do not change which proposition an atom name stands for
+_COPULAS = frozenset("is am are be been being".split())
+# a leading subject pronoun is dropped from the key; the first person (the default speaker)
+# and "it" (It_Rains is Rains) are dropped silently, any other is kept as a marker
+_SUBJECTS = frozenset("i you he she we they it".split())
+_SILENT_SUBJECTS = frozenset(("i", "it"))
+# pronouns elsewhere in the name are markers: I_Love_You is not You_Love_Me, My_Car is not Your_Car
+_PRONOUNS = frozenset(
+    "i me my mine myself you your yours yourself yourselves he him his himself she her hers herself "
+    "we us our ours ourselves they them their theirs themselves it its itself".split()
+)
+# irregular forms folded onto one spelling (same tense only: Had_Money is not Has_Money)
+_IRREGULAR = {"has": "have", "does": "do", "were": "was"}
+# words that flip or shift the meaning of a name; names whose markers differ are never merged
+_NEGATIONS = {
+    "not": "not", "dont": "not", "doesnt": "not", "didnt": "not", "cannot": "not", "cant": "not",
+    "isnt": "not", "arent": "not", "wasnt": "not", "werent": "not", "wont": "not", "no": "no",
+    "never": "never", "nor": "nor", "none": "none", "nobody": "none", "nothing": "none",
+}
+_TENSES = frozenset("had was did will would shall".split())
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+# very small suffix stemmer, enough to fold Feels/Feeling/Feel together
+# (no -ed: Walked_Home and Walk_Home are different statements)
+def stem(word: str) -> str:
+    word = _IRREGULAR.get(word, word)
+    for suffix, replacement in (("ies", "y"), ("sses", "ss"), ("ing", ""), ("es", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == "s" and word.endswith("ss"):
+                break
+            # boxes -> box, but cakes -> cake
+            if suffix == "es" and not word[:-2].endswith(("s", "x", "z", "ch", "sh")):
+                continue
+            return word[: len(word) - len(suffix)] + replacement
+    return word
+
+
+def _words(name: str) -> list:
+    return [word.lower() for part in name.split("_") for word in _WORD.findall(part)]
+
+
+# (leading subject pronoun or None, the remaining words)
+def _split_subject(name: str) -> tuple:
+    words = _words(name)
+    if len(words) > 1 and words[0] in _SUBJECTS:
+        return words[0], words[1:]
+    return None, words
+
+
+# canonical key of an atom name: Feel_Sad, Feels_Sad and I_Feel_Sad all become "feel_sad"
+def normalize(name: str) -> str:
+    _, words = _split_subject(name)
+    kept = [stem(word) for word in words if word not in _COPULAS]
+    return "_".join(kept or words)
+
+
+# the negation, tense and pronoun markers of a name:
+# Should_Not_Eat_Cake -> (("not",), (), ()), You_Love_Me -> ((), (), ("me", "you"))
+def markers(name: str) -> tuple:
+    subject, words = _split_subject(name)
+    negations = tuple(sorted({_NEGATIONS[word] for word in words if word in _NEGATIONS}))
+    tenses = tuple(sorted({_IRREGULAR.get(word, word) for word in words} & _TENSES))
+    pronouns = {word for word in words if word in _PRONOUNS}
+    if subject is not None and subject not in _SILENT_SUBJECTS:
+        pronouns.add(subject)
+    return negations, tenses, tuple(sorted(pronouns))
+
+
+def trigrams(key: str) -> set:
+    padded = f"${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AtomCanonicalizer:
+    """
+    Maps new atom names onto existing ones that mean the same thing.
+    - Names with the same normalized key (case, underscores, stemming, copulas,
+      a leading I / It) and the same markers are merged directly.
+    - Otherwise a character-trigram index finds the most similar known key;
+      a Jaccard similarity of at least `threshold` merges the names.
+    Names with different negation, tense or pronoun markers (Should_Not_Eat_Cake
+    vs Should_Eat_Cake, Had_Money vs Has_Money, My_Car_Is_Red vs
+    Your_Car_Is_Red) are never merged.
+    The index is bucketed by markers and trigram count. A lookup only visits
+    the buckets whose size allows the threshold, closest size first, and only
+    the postings of the rarest trigrams that any match must share; at most
+    max_candidates names are scored, so lookups stay well under a millisecond
+    on large vocabularies with many shared words (a match missed that way only
+    leaves a duplicate atom, never a wrong merge).
+    """
+
+    def __init__(self, names=(), threshold: float = 0.85, max_candidates: int = 64):
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self._resolved = {}                 # any seen name -> canonical name
+        self._by_key = {}                   # (markers, normalized key) -> canonical name
+        self._grams = {}                    # canonical name -> trigram set of its key
+        # (markers, trigram count) -> trigram -> canonical names
+        self._buckets = defaultdict(lambda: defaultdict(set))
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    # registers a name as canonical (if its key is not taken yet)
+    def add(self, name: str) -> str:
+        key = normalize(name)
+        name_markers = markers(name)
+        canonical = self._by_key.get((name_markers, key))
+        if canonical is None:
+            canonical = name
+            self._by_key[(name_markers, key)] = name
+            grams = trigrams(key)
+            self._grams[name] = grams
+            postings = self._buckets[(name_markers, len(grams))]
+            for gram in grams:
+                postings[gram].add(name)
+        self._resolved[name] = canonical
+        return canonical
+
+    # the best known match for a name above the threshold, or None
+    def match(self, name: str):
+        key = normalize(name)
+        name_markers = markers(name)
+        if (name_markers, key) in self._by_key:
+            return self._by_key[(name_markers, key)]
+        grams = trigrams(key)
+        if not grams:
+            return None
+
+        threshold = self.threshold
+        size = len(grams)
+        best, best_score = None, threshold
+        budget = self.max_candidates
+        # (the small epsilon keeps float rounding from excluding exact bounds)
+        sizes = range(math.ceil(threshold * size - 1e-9), math.floor(size / threshold + 1e-9) + 1)
+        for other_size in sorted(sizes, key=lambda other: abs(other - size)):
+            if budget <= 0:
+                break
+            postings = self._buckets.get((name_markers, other_size))
+            if not postings:
+                continue
+            # Jaccard >= threshold needs `need` shared trigrams, so a match must
+            # contain one of the (size - need + 1) rarest ones of this bucket
+            need = math.ceil(threshold * (size + other_size) / (1 + threshold) - 1e-9)
+            if need > min(size, other_size):
+                continue
+            rarest = sorted(grams, key=lambda gram: len(postings.get(gram, ())))
+            candidates = set()
+            for gram in rarest[: size - need + 1]:
+                posting = postings.get(gram, ())
+                if len(candidates) + len(posting) > budget:
+                    candidates.update(itertools.islice(posting, budget - len(candidates)))
+                    break
+                candidates.update(posting)
+            budget -= len(candidates)
+            for candidate in candidates:
+                shared = len(grams & self._grams[candidate])
+                if shared < need:
+                    continue
+                score = shared / (size + other_size - shared)
+                if score > best_score or (score == best_score and best is None):
+                    best, best_score = candidate, score
+        return best
+
+    # the canonical name for an atom; unknown atoms become canonical themselves
+    def canonical(self, name: str) -> str:
+        known = self._resolved.get(name)
+        if known is not None:
+            return known
+        found = self.match(name)
+        if found is None:
+            return self.add(name)
+        self._resolved[name] = found
+        return found
+
+    # rewrites a LogicResult onto canonical atoms
+    # definitions of atoms merged into another one are dropped, that atom is defined already
+    def canonicalize_result(self, result: LogicResult) -> LogicResult:
+        mapping = {}
+        definitions = {}
+        for name, description in result.definitions.items():
+            canonical = self.canonical(name)
+            mapping[name] = canonical
+            if canonical == name:
+                definitions.setdefault(name, description)
+        formula = result.formula
+        for name in formula.atoms():
+            if name not in mapping:
+                mapping[name] = self.canonical(name)
+        if all(source == target for source, target in mapping.items()):
+            return result
+        return LogicResult(definitions, str(formula.rename(mapping)))
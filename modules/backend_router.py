@@ -0,0 +1,261 @@
+import asyncio
+import threading
+import time
+
+from modules import metrics
+
+
+_WAIT = object()
+
+
+class NoBackendAvailable(RuntimeError):
+    """Raised when every backend failed (or was tried) for a request."""
+
+
+class Backend:
+    """
+    One model server the router can send requests to.
+    - chain: anything with stream(inputs) / astream(inputs), e.g.
+      prompt | ChatOllama(base_url=..., model=...) | StrOutputParser()
+    - max_concurrency: requests this backend serves at the same time
+    - model: the model it serves (part of the response cache key)
+    - health: optional callable returning True while the server is healthy,
+      probed by BackendRouter.check_health()
+    """
+
+    def __init__(self, name: str, chain, max_concurrency: int = 1, model: str = None, health=None):
+        self.name = name
+        self.chain = chain
+        self.max_concurrency = max_concurrency
+        self.model = model
+        self.health = health
+        self.healthy = True
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0               # consecutive failures
+        self.ejections = 0              # consecutive ejections, grows the ejection time
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until and self.outstanding < self.max_concurrency
+
+    def stats(self) -> dict:
+        return {
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "served": self.served,
+            "failures": self.failures,
+            "healthy": self.healthy,
+            "ejected_for": max(0.0, self.ejected_until - time.monotonic()),
+        }
+
+
+class BackendRouter:
+    """
+    Spreads requests over several backends (hosts and/or models).
+    - Scheduling: the available backend with the fewest outstanding requests
+      relative to its max_concurrency; when all are busy the caller waits.
+    - Ejection: after max_failures consecutive failures a backend is taken out
+      for ejection_time seconds, doubling on each repeated ejection (up to
+      max_ejection_time). Afterwards it takes requests again, but a single
+      failure ejects it again until it has served one successfully.
+    - Health: backends with a health probe are checked every health_interval
+      seconds on a background thread (or on check_health()); a backend whose
+      probe fails takes no requests until a probe succeeds again, and when
+      every backend is unhealthy requests fail right away (NoBackendAvailable).
+    - Retry: a request that fails before its first chunk is retried on another
+      backend. Once chunks have been handed out the error is raised, since a
+      retry would repeat output the caller already consumed.
+    Drop-in for the chain of ModelInterface: stream(), astream() and invoke().
+    """
+
+    def __init__(self, backends, max_failures: int = 3, ejection_time: float = 5.0,
+                 max_ejection_time: float = 120.0, health_interval: float = None):
+        self.backends = list(backends)
+        if not self.backends:
+            raise ValueError("BackendRouter needs at least one backend")
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._cond = threading.Condition()
+        self._async_waiters = []
+        self._health_stop = threading.Event()
+        self._health_thread = None
+        if health_interval and any(backend.health is not None for backend in self.backends):
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,), name="BackendHealth", daemon=True
+            )
+            self._health_thread.start()
+
+    # the models served by the pool, sorted
+    @property
+    def models(self) -> list:
+        return sorted({backend.model for backend in self.backends if backend.model})
+
+    def stream(self, inputs, **kwargs):
+        tried = set()
+        last_error = None
+        while True:
+            backend = self._acquire(tried)
+            if backend is None:
+                raise NoBackendAvailable("all backends failed") from last_error
+            started, outcome = False, None
+            try:
+                for chunk in backend.chain.stream(inputs, **kwargs):
+                    started = True
+                    yield chunk
+                outcome = True
+                return
+            except GeneratorExit:
+                # the caller stopped reading, that says nothing about the backend
+                raise
+            except Exception as error:
+                outcome, last_error = False, error
+                if started:
+                    raise
+                tried.add(backend)
+                metrics.registry.increment("router.retries")
+            finally:
+                self._release(backend, outcome)
+
+    async def astream(self, inputs, **kwargs):
+        tried = set()
+        last_error = None
+        while True:
+            backend = await self._aacquire(tried)
+            if backend is None:
+                raise NoBackendAvailable("all backends failed") from last_error
+            started, outcome = False, None
+            try:
+                async for chunk in backend.chain.astream(inputs, **kwargs):
+                    started = True
+                    yield chunk
+                outcome = True
+                return
+            except (GeneratorExit, asyncio.CancelledError):
+                raise
+            except Exception as error:
+                outcome, last_error = False, error
+                if started:
+                    raise
+                tried.add(backend)
+                metrics.registry.increment("router.retries")
+            finally:
+                self._release(backend, outcome)
+
+    def invoke(self, inputs, **kwargs) -> str:
+        return "".join(self.stream(inputs, **kwargs))
+
+    async def ainvoke(self, inputs, **kwargs) -> str:
+        return "".join([chunk async for chunk in self.astream(inputs, **kwargs)])
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {backend.name: backend.stats() for backend in self.backends}
+
+    # probes every backend that has a health check; returns {name: healthy}
+    # a probe that raises counts as unhealthy
+    def check_health(self) -> dict:
+        results = {}
+        for backend in self.backends:
+            if backend.health is None:
+                continue
+            try:
+                healthy = bool(backend.health())
+            except Exception:
+                healthy = False
+            results[backend.name] = healthy
+            if healthy != backend.healthy:
+                metrics.registry.increment("router.recoveries" if healthy else "router.unhealthy")
+                self._set_healthy(backend, healthy)
+        return results
+
+    # stops the health checks
+    def close(self):
+        self._health_stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+
+    def _health_loop(self, interval: float):
+        while not self._health_stop.is_set():
+            self.check_health()
+            self._health_stop.wait(interval)
+
+    def _set_healthy(self, backend, healthy: bool):
+        with self._cond:
+            backend.healthy = healthy
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    # --- scheduling ---
+
+    # (backend, _) the least loaded available backend not in `tried`, reserved
+    # (_WAIT, seconds) all candidates are busy or ejected; seconds until an ejection ends or None
+    # (None, _) no candidates left, or all of them failed their health probe
+    def _pick(self, tried):
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends if backend not in tried and backend.healthy]
+        if not candidates:
+            return None, 0.0
+        available = [backend for backend in candidates if backend.is_available(now)]
+        if not available:
+            # a release wakes the waiters; an ejection ending does not, so time out for it
+            ejected = [backend.ejected_until - now for backend in candidates if backend.ejected_until > now]
+            return _WAIT, min(ejected, default=None)
+        backend = min(available, key=lambda b: (b.outstanding / b.max_concurrency, b.served))
+        backend.outstanding += 1
+        return backend, 0.0
+
+    def _acquire(self, tried):
+        with self._cond:
+            while True:
+                backend, wait = self._pick(tried)
+                if backend is not _WAIT:
+                    return backend
+                self._cond.wait(wait)
+
+    async def _aacquire(self, tried):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                backend, wait = self._pick(tried)
+                if backend is not _WAIT:
+                    return backend
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(future, wait)
+            except asyncio.TimeoutError:
+                pass
+
+    # outcome: True success, False failure, None neither (caller stopped early)
+    def _release(self, backend, outcome):
+        with self._cond:
+            backend.outstanding -= 1
+            if outcome is True:
+                backend.served += 1
+                backend.failures = 0
+                backend.ejections = 0
+            elif outcome is False:
+                backend.failures += 1
+                if backend.failures >= self.max_failures or backend.ejections:
+                    self._eject(backend)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _eject(self, backend):
+        backend.ejected_until = time.monotonic() + min(
+            self.max_ejection_time, self.ejection_time * 2 ** backend.ejections)
+        backend.ejections += 1
+        backend.failures = 0
+        metrics.registry.increment("router.ejections")
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,419 @@
+from modules.knowledge_base import as_formula
+from modules.logic_ast import ATOM, NOT, AND, OR
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD:
+    """
+    Reduced ordered binary decision diagram manager.
+    - Nodes are ints; FALSE (0) and TRUE (1) are the terminals. Equal functions
+      are the same node, so equivalence is an int comparison.
+    - A unique table keeps the diagram reduced; a fixed-size, direct-mapped
+      operation cache memoizes ITE (colliding entries simply overwrite).
+    - reorder() sifts variables to shrink the diagram. Node ids keep their
+      meaning across reordering, but only nodes protected with ref() (and
+      whatever they reach) survive garbage collection.
+    """
+
+    def __init__(self, var_order=(), cache_size: int = 1 << 16, auto_reorder: bool = False,
+                 reorder_threshold: int = 100000):
+        self._var = [-1, -1]         # node -> variable index (-1 for terminals)
+        self._low = [0, 1]
+        self._high = [0, 1]
+        self._unique = {}            # (var, low, high) -> node
+        self._free = []              # node ids released by garbage collection
+        self._names = []             # variable index -> name
+        self._index = {}             # name -> variable index
+        self._level = []             # variable index -> level (0 is the top)
+        self._order = []             # level -> variable index
+        self._refs = {}              # externally referenced node -> count
+        self._cache_mask = (1 << max(1, cache_size - 1).bit_length()) - 1
+        self._cache = [None] * (self._cache_mask + 1)
+        self.auto_reorder = auto_reorder
+        self.reorder_threshold = reorder_threshold
+        for name in var_order:
+            self.add_var(name)
+
+    # --- variables ---
+
+    # declares a variable below all existing ones; returns its index
+    def add_var(self, name: str) -> int:
+        if name in self._index:
+            return self._index[name]
+        index = len(self._names)
+        self._names.append(name)
+        self._index[name] = index
+        self._level.append(len(self._order))
+        self._order.append(index)
+        return index
+
+    # the node for a single variable (declared on first use)
+    def var(self, name: str) -> int:
+        return self._mk(self.add_var(name), FALSE, TRUE)
+
+    # variable names from top to bottom
+    def var_order(self) -> list:
+        return [self._names[index] for index in self._order]
+
+    @property
+    def num_vars(self) -> int:
+        return len(self._names)
+
+    # number of internal nodes currently allocated (including unreferenced ones)
+    def node_count(self) -> int:
+        return len(self._unique)
+
+    # --- references and garbage collection ---
+
+    # protects a node (and everything below it) from garbage collection
+    def ref(self, node: int) -> int:
+        self._refs[node] = self._refs.get(node, 0) + 1
+        return node
+
+    def deref(self, node: int):
+        count = self._refs.get(node, 0) - 1
+        if count > 0:
+            self._refs[node] = count
+        else:
+            self._refs.pop(node, None)
+
+    # frees every node that is not reachable from a referenced node
+    def collect(self) -> int:
+        live = self._reachable(self._refs)
+        dead = [node for node in self._unique.values() if node not in live]
+        for node in dead:
+            self._release(node)
+        self._clear_cache()
+        return len(dead)
+
+    # --- operations ---
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        return self._after_op(self._ite(f, g, h))
+
+    def negate(self, f: int) -> int:
+        return self._after_op(self._ite(f, FALSE, TRUE))
+
+    def conjoin(self, f: int, g: int) -> int:
+        return self._after_op(self._ite(f, g, FALSE))
+
+    def disjoin(self, f: int, g: int) -> int:
+        return self._after_op(self._ite(f, TRUE, g))
+
+    def implies(self, f: int, g: int) -> int:
+        return self._after_op(self._ite(f, g, TRUE))
+
+    # compiles a Formula (or expression string) into a node
+    def from_formula(self, formula) -> int:
+        nodes = {}
+        for sub in as_formula(formula).subformulas():
+            if sub.op == ATOM:
+                nodes[sub] = self._mk(self.add_var(sub.name), FALSE, TRUE)
+            elif sub.op == NOT:
+                nodes[sub] = self._ite(nodes[sub.children[0]], FALSE, TRUE)
+            else:
+                a, b = nodes[sub.children[0]], nodes[sub.children[1]]
+                if sub.op == AND:
+                    nodes[sub] = self._ite(a, b, FALSE)
+                elif sub.op == OR:
+                    nodes[sub] = self._ite(a, TRUE, b)
+                else:
+                    nodes[sub] = self._ite(a, b, TRUE)
+        return self._after_op(nodes[as_formula(formula)])
+
+    # O(1): canonical nodes are equal exactly when the functions are
+    def equivalent(self, f: int, g: int) -> bool:
+        return f == g
+
+    # number of satisfying assignments over all declared variables
+    def count(self, f: int) -> int:
+        bottom = len(self._order)
+        counts = {FALSE: 0, TRUE: 1}
+
+        def level(node):
+            return bottom if node <= TRUE else self._level[self._var[node]]
+
+        stack = [f]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            low, high = self._low[node], self._high[node]
+            pending = [child for child in (low, high) if child not in counts]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            here = level(node)
+            counts[node] = (counts[low] << (level(low) - here - 1)) + \
+                           (counts[high] << (level(high) - here - 1))
+        return counts[f] << level(f)
+
+    # one satisfying assignment {name: bool} of the variables on a path, or None
+    def pick(self, f: int) -> dict:
+        if f == FALSE:
+            return None
+        assignment = {}
+        while f > TRUE:
+            name = self._names[self._var[f]]
+            if self._low[f] != FALSE:
+                assignment[name] = False
+                f = self._low[f]
+            else:
+                assignment[name] = True
+                f = self._high[f]
+        return assignment
+
+    # names of the variables the function depends on
+    def support(self, f: int) -> set:
+        return {self._names[self._var[node]] for node in self._reachable([f]) if node > TRUE}
+
+    # --- dynamic reordering ---
+
+    # sifting: moves each variable through every level and leaves it where the
+    # diagram was smallest. Returns the number of live nodes afterwards.
+    def reorder(self) -> int:
+        self.collect()
+        if len(self._order) < 2:
+            return len(self._unique)
+
+        # reference counts and per-variable node sets only exist while reordering
+        self._rc = {node: 0 for node in self._unique.values()}
+        self._rc[FALSE] = self._rc[TRUE] = 0
+        self._nodes = [set() for _ in self._names]
+        for (var, low, high), node in self._unique.items():
+            self._nodes[var].add(node)
+            self._rc[low] += 1
+            self._rc[high] += 1
+        for node, count in self._refs.items():
+            self._rc[node] = self._rc.get(node, 0) + count
+
+        try:
+            by_size = sorted(range(len(self._names)), key=lambda var: -len(self._nodes[var]))
+            for var in by_size:
+                self._sift(var)
+        finally:
+            del self._rc
+            del self._nodes
+            self._clear_cache()
+        return len(self._unique)
+
+    def _sift(self, var):
+        bottom = len(self._order) - 1
+        best_size = len(self._unique)
+        best_level = self._level[var]
+        # go down first, then all the way up, then back to the best level seen
+        while self._level[var] < bottom:
+            self._swap(self._level[var])
+            if len(self._unique) < best_size:
+                best_size, best_level = len(self._unique), self._level[var]
+        while self._level[var] > 0:
+            self._swap(self._level[var] - 1)
+            if len(self._unique) < best_size:
+                best_size, best_level = len(self._unique), self._level[var]
+        while self._level[var] < best_level:
+            self._swap(self._level[var])
+
+    # exchanges the variables at `level` and `level + 1`, rewriting nodes in place
+    def _swap(self, level):
+        x, y = self._order[level], self._order[level + 1]
+        var, low, high = self._var, self._low, self._high
+        for f in list(self._nodes[x]):
+            f0, f1 = low[f], high[f]
+            f0_has_y = var[f0] == y
+            f1_has_y = var[f1] == y
+            if not (f0_has_y or f1_has_y):
+                continue      # independent of y: stays an x node, now one level lower
+            f00, f01 = (low[f0], high[f0]) if f0_has_y else (f0, f0)
+            f10, f11 = (low[f1], high[f1]) if f1_has_y else (f1, f1)
+            new_low = self._mk_rc(x, f00, f10)
+            new_high = self._mk_rc(x, f01, f11)
+            del self._unique[(x, f0, f1)]
+            self._nodes[x].discard(f)
+            var[f], low[f], high[f] = y, new_low, new_high
+            self._unique[(y, new_low, new_high)] = f
+            self._nodes[y].add(f)
+            self._dec_rc(f0)
+            self._dec_rc(f1)
+        self._order[level], self._order[level + 1] = y, x
+        self._level[x], self._level[y] = level + 1, level
+
+    # like _mk but maintains the reordering reference counts
+    def _mk_rc(self, v, low, high):
+        if low == high:
+            self._rc[low] += 1
+            return low
+        node = self._unique.get((v, low, high))
+        if node is None:
+            node = self._mk(v, low, high)
+            self._rc[node] = 0
+            self._rc[low] += 1
+            self._rc[high] += 1
+            self._nodes[v].add(node)
+        self._rc[node] += 1
+        return node
+
+    def _dec_rc(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node <= TRUE:
+                continue
+            self._rc[node] -= 1
+            if self._rc[node] == 0:
+                stack.append(self._low[node])
+                stack.append(self._high[node])
+                self._nodes[self._var[node]].discard(node)
+                del self._rc[node]
+                self._release(node)
+
+    # --- internals ---
+
+    def _mk(self, v, low, high):
+        if low == high:
+            return low
+        key = (v, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            if self._free:
+                node = self._free.pop()
+                self._var[node], self._low[node], self._high[node] = v, low, high
+            else:
+                node = len(self._var)
+                self._var.append(v)
+                self._low.append(low)
+                self._high.append(high)
+            self._unique[key] = node
+        return node
+
+    def _release(self, node):
+        del self._unique[(self._var[node], self._low[node], self._high[node])]
+        self._var[node] = -1
+        self._free.append(node)
+
+    def _clear_cache(self):
+        self._cache = [None] * (self._cache_mask + 1)
+
+    def _reachable(self, roots) -> set:
+        seen = set()
+        stack = [node for node in roots if node > TRUE]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            for child in (self._low[node], self._high[node]):
+                if child > TRUE and child not in seen:
+                    stack.append(child)
+        return seen
+
+    def _after_op(self, result):
+        if self.auto_reorder and len(self._unique) > self.reorder_threshold:
+            self.ref(result)
+            try:
+                self.reorder()
+            finally:
+                self.deref(result)
+            # keep headroom so reordering does not run after every operation
+            self.reorder_threshold = max(self.reorder_threshold, 2 * len(self._unique))
+        return result
+
+    # if-then-else, the one operation every other connective reduces to
+    # iterative so deep diagrams do not hit the recursion limit
+    def _ite(self, f, g, h):
+        var, low, high, level = self._var, self._low, self._high, self._level
+        cache, mask = self._cache, self._cache_mask
+        bottom = len(self._order)
+        work = [(f, g, h)]
+        results = []
+        while work:
+            item = work.pop()
+            if len(item) == 2:
+                # build step: both cofactor results are on the results stack
+                v, key = item
+                high_result = results.pop()
+                low_result = results.pop()
+                node = self._mk(v, low_result, high_result)
+                cache[hash(key) & mask] = (key, node)
+                results.append(node)
+                continue
+
+            f, g, h = item
+            # terminal cases
+            if f == TRUE or g == h:
+                results.append(g)
+                continue
+            if f == FALSE:
+                results.append(h)
+                continue
+            if g == TRUE and h == FALSE:
+                results.append(f)
+                continue
+
+            entry = cache[hash(item) & mask]
+            if entry is not None and entry[0] == item:
+                results.append(entry[1])
+                continue
+
+            top = min(level[var[n]] if n > TRUE else bottom for n in item)
+            v = self._order[top]
+            f0, f1 = (low[f], high[f]) if var[f] == v else (f, f)
+            g0, g1 = (low[g], high[g]) if g > TRUE and var[g] == v else (g, g)
+            h0, h1 = (low[h], high[h]) if h > TRUE and var[h] == v else (h, h)
+            work.append((v, item))
+            work.append((f1, g1, h1))
+            work.append((f0, g0, h0))
+        return results[0]
+
+
+class BDDKnowledgeBase:
+    """
+    The running knowledge base kept as one canonical BDD.
+    add() reports whether a turn added information, entails() and
+    equivalent() are answered without re-solving anything.
+    """
+
+    def __init__(self, bdd: BDD = None):
+        self.bdd = bdd or BDD()
+        self.root = self.bdd.ref(TRUE)
+
+    def _set_root(self, node):
+        self.bdd.ref(node)
+        self.bdd.deref(self.root)
+        self.root = node
+
+    # conjoins a formula into the knowledge base; returns False if nothing changed,
+    # i.e. the formula was already entailed
+    def add(self, formula) -> bool:
+        node = self.bdd.ref(self.bdd.from_formula(formula))
+        try:
+            updated = self.bdd.conjoin(self.root, node)
+        finally:
+            self.bdd.deref(node)
+        if updated == self.root:
+            return False
+        self._set_root(updated)
+        return True
+
+    def entails(self, formula) -> bool:
+        node = self.bdd.ref(self.bdd.from_formula(formula))
+        try:
+            return self.bdd.conjoin(self.root, node) == self.root
+        finally:
+            self.bdd.deref(node)
+
+    def equivalent(self, formula) -> bool:
+        return self.bdd.from_formula(formula) == self.root
+
+    def is_satisfiable(self) -> bool:
+        return self.root != FALSE
+
+    # models over every variable the manager knows about
+    def count_models(self) -> int:
+        return self.bdd.count(self.root)
+
+    def model(self) -> dict:
+        return self.bdd.pick(self.root)
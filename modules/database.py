@@ -1,41 +1,139 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
 
+from modules.definition_index import DefinitionIndex
+from modules.definition_parser import iter_definitions
 
 
 class Database:
-    
-    records = {}
+    """
+    Atom definitions (name -> description) stored in SQLite.
+    - The table is keyed on the atom name, so single and prefix lookups use the index.
+    - Writes of one turn go into a single transaction.
+    - A small LRU dict in front of the table serves repeated reads.
+    path=":memory:" keeps everything in memory (nothing survives a restart).
+    """
+
+    def __init__(self, path: str = ":memory:", cache_size: int = 4096):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS definitions ("
+            " name TEXT PRIMARY KEY,"
+            " description TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+        # relevance index used to pick prompt context; descriptions stay on disk
+        self.index = DefinitionIndex(self.iter_records(), lookup=self.get)
 
-        
     # add the record of type "name: definition" to the database
+    # the record may hold any number of definitions, one or more per line
     def add_record(self, record: str):
-        # 1. Safety Check: Ignore empty or whitespace-only strings
-        if not record or not record.strip():
-            return
+        self.add_definitions(dict(iter_definitions(record)))
 
-        # count the number of definitions in the record
-        num_definitions = record.count(": ")
+    # bulk ingest of a definitions block, given as a string or an iterable of
+    # chunks (e.g. an llm stream); parsed in one pass and written batch_size at a time
+    def add_records(self, source, batch_size: int = 10000) -> int:
+        added = 0
+        batch = {}
+        for name, descript in iter_definitions(source):
+            batch[name] = descript
+            if len(batch) >= batch_size:
+                self.add_definitions(batch)
+                added += len(batch)
+                batch = {}
+        self.add_definitions(batch)
+        return added + len(batch)
 
-        # if more do recursion
-        if num_definitions > 1:
-            definitions = record.split(".")
-            for definition in definitions:
-                # This recursion will now be safe because of the check at step #1
-                self.add_record(definition)
+    # add already parsed definitions (atom name -> description), e.g. LogicResult.definitions
+    # all of them are written in one transaction
+    def add_definitions(self, definitions: dict):
+        if not definitions:
             return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO definitions (name, description) VALUES (?, ?)",
+                    definitions.items(),
+                )
+            for name, descript in definitions.items():
+                self._remember(name, descript)
+        for name, descript in definitions.items():
+            self.index.add(name, descript)
+
+    # description of one atom, or None
+    def get(self, name: str):
+        with self._lock:
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                return self._cache[name]
+            row = self._conn.execute(
+                "SELECT description FROM definitions WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._remember(name, row[0])
+            return row[0]
+
+    # definitions whose name starts with prefix, in name order
+    def find_prefix(self, prefix: str, limit: int = 100) -> dict:
+        query = "SELECT name, description FROM definitions"
+        args = []
+        if prefix:
+            # a range on the primary key instead of LIKE, so the index is used
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            query += " WHERE name >= ? AND name < ?"
+            args = [prefix, upper]
+        query += " ORDER BY name LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return dict(self._conn.execute(query, args).fetchall())
+
+    # streams (name, description) pairs without loading the table
+    def iter_records(self):
+        with self._lock:
+            cursor = self._conn.execute("SELECT name, description FROM definitions")
+            rows = cursor.fetchmany(1000)
+        while rows:
+            yield from rows
+            with self._lock:
+                rows = cursor.fetchmany(1000)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM definitions").fetchone()[0]
 
-        # 2. Validation: Ensure the split actually results in two parts
-        parts = record.split(": ", 1)
-        if len(parts) == 2:
-            name = parts[0].strip()
-            descript = parts[1].strip()
-            self.records[name] = descript
-        else:
-            # Optional: Log a warning for malformed records if necessary
-            # print(f"Skipping malformed record: {record}")
-            pass
     #get the list of records in the database
+    # loads the whole table, prefer get/find_prefix/get_relevant_records on big databases
     def get_record_list(self):
-        return self.records
-    
+        return dict(self.iter_records())
+    # get only the records relevant to a statement, bounded by k and a token budget
+    # keeps the prompt size flat no matter how large the database grows
+    def get_relevant_records(self, statement: str, k: int = 20, token_budget: int = 512):
+        return self.index.select(statement, k=k, token_budget=token_budget)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
 
-    
\ No newline at end of file
+    def _remember(self, name, descript):
+        self._cache[name] = descript
+        self._cache.move_to_end(name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,132 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+
+# words that carry no meaning for relevance ranking
+STOPWORDS = frozenset("""
+a an the i me my we our you your he she it its they them their is am are was were be been
+being do does did to of in on at by for with from as and or not no that this these those
+if then so but than there here what which who whom when where why how can will would should
+could may might must have has had just very also
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# splits text (or a Snake_Case atom name) into lowercase index terms
+def tokenize(text: str) -> list:
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        # cheap plural folding so "desserts" matches "Dessert"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+# rough token count used for prompt budgeting (about 4 characters per token)
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class DefinitionIndex:
+    """
+    Inverted index over atom definitions.
+    - Terms from the atom name weigh more than terms from the description.
+    - select() ranks definitions against a statement with tf-idf style scoring
+      and returns the best ones that fit in a token budget.
+    - With a lookup callable (name -> description) descriptions are fetched on
+      demand instead of being kept in memory, e.g. from an on-disk Database.
+    """
+
+    NAME_WEIGHT = 2.0
+    DESCRIPTION_WEIGHT = 1.0
+    # terms found in more records than this are too common to rank by
+    # (skipping them also caps the work per query term, however big the database)
+    MAX_POSTING = 2000
+
+    def __init__(self, records=None, lookup=None):
+        self._postings = defaultdict(dict)   # term -> {name: weight}
+        self._terms = {}                     # name -> set of terms (for updates)
+        self._costs = {}                     # name -> rendered size in tokens
+        self._lookup = lookup
+        self._descriptions = {} if lookup is None else None
+        # records may be a dict or an iterable of (name, description) pairs
+        if isinstance(records, dict):
+            records = records.items()
+        for name, description in records or ():
+            self.add(name, description)
+
+    def __len__(self) -> int:
+        return len(self._costs)
+
+    # indexes (or re-indexes) a single definition
+    def add(self, name: str, description: str):
+        if name in self._terms:
+            self.remove(name)
+
+        weights = {}
+        for term in tokenize(name):
+            weights[term] = weights.get(term, 0.0) + self.NAME_WEIGHT
+        for term in tokenize(description):
+            weights[term] = weights.get(term, 0.0) + self.DESCRIPTION_WEIGHT
+
+        for term, weight in weights.items():
+            self._postings[term][name] = weight
+        self._terms[name] = set(weights)
+        self._costs[name] = estimate_tokens(f"'{name}': '{description}', ")
+        if self._descriptions is not None:
+            self._descriptions[name] = description
+
+    def remove(self, name: str):
+        for term in self._terms.pop(name, ()):
+            posting = self._postings[term]
+            posting.pop(name, None)
+            if not posting:
+                del self._postings[term]
+        self._costs.pop(name, None)
+        if self._descriptions is not None:
+            self._descriptions.pop(name, None)
+
+    # scored names best first: the top `size` come from a bounded heap, and the rest are only
+    # sorted when the caller walks past them (entries skipped by the token budget)
+    @staticmethod
+    def _ranked(scores: dict, size: int):
+        key = lambda item: (-item[1], item[0])
+        top = heapq.nsmallest(size, scores.items(), key=key)
+        yield from top
+        if len(top) < len(scores):
+            yield from sorted(scores.items(), key=key)[len(top):]
+
+    # returns the most relevant definitions for a statement
+    # at most k entries, whose rendered size stays within token_budget
+    # the result is sorted by name so identical selections render identically
+    def select(self, statement: str, k: int = 20, token_budget: int = 512) -> dict:
+        total = len(self._costs)
+        if total == 0:
+            return {}
+
+        scores = defaultdict(float)
+        for term in set(tokenize(statement)):
+            posting = self._postings.get(term)
+            if not posting or len(posting) > self.MAX_POSTING:
+                continue
+            idf = math.log(1.0 + total / len(posting))
+            for name, weight in posting.items():
+                scores[name] += idf * weight
+
+        selected = []
+        used = 0
+        for name, _ in self._ranked(scores, 4 * k):
+            if len(selected) >= k:
+                break
+            cost = self._costs[name]
+            if used + cost > token_budget:
+                continue
+            selected.append(name)
+            used += cost
+        lookup = self._lookup or self._descriptions.__getitem__
+        return {name: lookup(name) for name in sorted(selected)}
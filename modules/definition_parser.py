@@ -0,0 +1,86 @@
+import re
+
+DEFINITIONS_MARKER = "Definitions:"
+EXPRESSION_MARKER = "Logic Form Expression:"
+
+# a Snake_Case atom name, as required by turn_into_logic
+ATOM_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# where a second "Name: ..." starts on the same line, right after a sentence end.
+# periods inside a description are left alone.
+_NEXT_DEFINITION = re.compile(r"(?<=\.)\s+(?=[A-Za-z_][A-Za-z0-9_]*: )")
+
+
+# strips list bullets and markdown emphasis the model sometimes adds
+def clean_line(line: str) -> str:
+    line = line.strip().lstrip("-*• ").strip()
+    return line.replace("**", "").replace("`", "").strip()
+
+
+# the (name, description) pairs on one line of a definitions block
+def parse_line(line: str) -> list:
+    line = clean_line(line)
+    if not line or line == DEFINITIONS_MARKER:
+        return []
+    pairs = []
+    for piece in _NEXT_DEFINITION.split(line):
+        name, sep, description = piece.partition(": ")
+        name = name.strip()
+        if sep and ATOM_NAME.match(name):
+            pairs.append((name, description.strip().rstrip(".").strip()))
+    return pairs
+
+
+class DefinitionParser:
+    """
+    Single-pass, line-oriented parser for a definitions block.
+    Feed it text in chunks of any size (e.g. straight from the llm stream);
+    each call returns the definitions completed so far. Parsing stops at the
+    "Logic Form Expression:" line.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._pending = []     # pieces of the current, unfinished line
+
+    def feed(self, chunk: str) -> list:
+        if self.done or not chunk:
+            return []
+        if "\n" not in chunk:
+            self._pending.append(chunk)
+            return []
+
+        lines = chunk.split("\n")
+        self._pending.append(lines[0])
+        first = "".join(self._pending)
+        self._pending = [lines[-1]]
+
+        pairs = []
+        for line in [first] + lines[1:-1]:
+            if EXPRESSION_MARKER in line:
+                self.done = True
+                break
+            pairs.extend(parse_line(line))
+        return pairs
+
+    # parses whatever is left after the last newline
+    def close(self) -> list:
+        if self.done:
+            return []
+        self.done = True
+        line = "".join(self._pending)
+        self._pending = []
+        if EXPRESSION_MARKER in line:
+            return []
+        return parse_line(line)
+
+
+# yields (name, description) pairs from a string or an iterable of chunks
+def iter_definitions(source):
+    if isinstance(source, str):
+        source = (source,)
+    parser = DefinitionParser()
+    for chunk in source:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.close()
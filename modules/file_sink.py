@@ -0,0 +1,114 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+_STOP = object()
+
+
+class BufferedFileSink:
+    """
+    Append-only log file written by a background thread.
+    - The file handle stays open; writers only put lines on a bounded queue
+      (a full queue blocks the writer instead of dropping lines).
+    - Lines are written in batches when flush_bytes is reached, every
+      flush_interval seconds, on flush() and on close() / interpreter exit.
+    - With max_bytes > 0 the file rotates to path.1 ... path.<backup_count>.
+    """
+
+    def __init__(self, path: str, flush_bytes: int = 64 * 1024, flush_interval: float = 1.0,
+                 queue_size: int = 10000, max_bytes: int = 0, backup_count: int = 3):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = open(path, "a", encoding="utf-8")
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="BufferedFileSink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, text: str):
+        if not self._closed:
+            self._queue.put(text)
+
+    # blocks until everything written so far is on disk
+    def flush(self):
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+        atexit.unregister(self.close)
+
+    # --- background thread ---
+
+    def _run(self):
+        buffer = []
+        size = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(buffer)
+                return
+            if isinstance(item, threading.Event):
+                self._write(buffer)
+                buffer, size = [], 0
+                item.set()
+                continue
+            if item is not None:
+                buffer.append(item)
+                size += len(item)
+
+            if size >= self.flush_bytes or time.monotonic() >= deadline:
+                self._write(buffer)
+                buffer, size = [], 0
+                deadline = time.monotonic() + self.flush_interval
+
+    # never raises: the thread must survive, or flush() would hang and writers block
+    def _write(self, buffer):
+        if not buffer:
+            return
+        try:
+            # a failed rotation (or reopen) leaves the file closed, try again
+            if self._file.closed:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(buffer))
+            self._file.flush()
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except Exception:
+            sys.stderr.write("\033[91mError: Could not write to log file.\033[0m\n")
+
+    def _rotate(self):
+        self._file.close()
+        try:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            if self.backup_count > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        finally:
+            # keep logging to the current file when the rotation failed
+            self._file = open(self.path, "a", encoding="utf-8")
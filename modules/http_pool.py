@@ -0,0 +1,141 @@
+import http.client
+import json
+import queue
+from urllib.parse import urlparse
+
+# errors of a kept-alive connection the server has closed in the meantime
+_STALE = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+
+class HttpError(RuntimeError):
+    """Raised for a non-2xx response; status and the decoded body are kept."""
+
+    def __init__(self, status: int, body):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class HttpPool:
+    """
+    A small pool of persistent HTTP/1.1 connections to one server.
+    - Connections are reused (no TCP handshake per request) and at most `size`
+      are kept; extra concurrent requests open temporary ones.
+    - A reused connection the server closed in the meantime is retried once
+      on a fresh connection.
+    - Connection errors (server down) surface as OSError, malformed responses
+      (not an HTTP server) as http.client.HTTPException.
+    - default_port is used when the url has none (443 / 80 if not given).
+    """
+
+    def __init__(self, url: str, size: int = 4, timeout: float = 30.0, default_port: int = None):
+        parsed = urlparse(url if "://" in url else f"http://{url}")
+        self.https = parsed.scheme == "https"
+        self.host = parsed.hostname
+        self.port = parsed.port or default_port or (443 if self.https else 80)
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        self.url = f"{parsed.scheme}://{host}:{self.port}"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._closed = False
+
+    # one request, returns (status, body bytes)
+    def request(self, method: str, path: str, payload=None, timeout: float = None) -> tuple:
+        response, connection = self._send(method, path, payload, timeout)
+        try:
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection, response)
+        return response.status, body
+
+    # json in, json out; raises HttpError for non-2xx responses
+    def json(self, method: str, path: str, payload=None, timeout: float = None):
+        status, body = self.request(method, path, payload, timeout)
+        if not 200 <= status < 300:
+            raise HttpError(status, _decode(body))
+        return json.loads(body) if body else None
+
+    # yields the objects of a newline-delimited json response as they arrive
+    # closing the generator early closes the connection (aborting the request)
+    def stream_json(self, method: str, path: str, payload=None, timeout: float = None):
+        response, connection = self._send(method, path, payload, timeout)
+        finished = False
+        try:
+            if not 200 <= response.status < 300:
+                body = response.read()
+                finished = True
+                raise HttpError(response.status, _decode(body))
+            for line in response:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            finished = True
+        finally:
+            if finished:
+                self._release(connection, response)
+            else:
+                connection.close()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # --- connections ---
+
+    def _send(self, method, path, payload, timeout):
+        body = None
+        headers = {"Connection": "keep-alive"}
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        timeout = self.timeout if timeout is None else timeout
+
+        reused, connection = self._acquire()
+        while True:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                return connection.getresponse(), connection
+            except _STALE:
+                connection.close()
+                if not reused:
+                    raise
+                reused, connection = False, self._connect()
+            except BaseException:
+                connection.close()
+                raise
+
+    def _acquire(self):
+        try:
+            return True, self._idle.get_nowait()
+        except queue.Empty:
+            return False, self._connect()
+
+    def _connect(self):
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection, response):
+        if self._closed or response.will_close:
+            connection.close()
+            return
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+
+def _decode(body: bytes):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", "replace")
@@ -0,0 +1,187 @@
+from modules.logic_ast import ATOM, NOT, AND, OR, Formula, parse
+from modules.sat_solver import Solver
+
+
+# accepts either an expression string or an already parsed Formula
+def as_formula(formula) -> Formula:
+    if isinstance(formula, Formula):
+        return formula
+    return parse(formula)
+
+
+class CnfEncoder:
+    """
+    Tseitin encoding of Formulas into a Solver.
+    Every distinct subformula gets one variable defined by equivalence clauses,
+    so shared (hash-consed) subformulas are encoded once. NOT needs no variable.
+    """
+
+    def __init__(self, solver: Solver):
+        self.solver = solver
+        self.atom_vars = {}    # atom name -> var
+        self._literals = {}    # Formula -> DIMACS literal
+
+    def atom_var(self, name: str) -> int:
+        var = self.atom_vars.get(name)
+        if var is None:
+            var = self.solver.new_var()
+            self.atom_vars[name] = var
+        return var
+
+    # returns a literal equivalent to the formula, adding its defining clauses
+    def literal(self, formula: Formula) -> int:
+        literals = self._literals
+        if formula in literals:
+            return literals[formula]
+        add = self.solver.add_clause
+        for node in formula.subformulas():
+            if node in literals:
+                continue
+            if node.op == ATOM:
+                literals[node] = self.atom_var(node.name)
+                continue
+            if node.op == NOT:
+                literals[node] = -literals[node.children[0]]
+                continue
+            a = literals[node.children[0]]
+            b = literals[node.children[1]]
+            v = self.solver.new_var()
+            if node.op == AND:
+                add([-v, a]); add([-v, b]); add([v, -a, -b])
+            elif node.op == OR:
+                add([-v, a, b]); add([v, -a]); add([v, -b])
+            else:  # IMPLY: v <-> (NOT a OR b)
+                add([-v, -a, b]); add([v, a]); add([v, -b])
+            literals[node] = v
+        return literals[formula]
+
+    # restricts a solver model to the atoms: {atom name: bool}
+    def atom_model(self, model: dict) -> dict:
+        return {name: model[var] for name, var in self.atom_vars.items()}
+
+
+class KnowledgeBase:
+    """
+    A set of formulas that can be checked for consistency and entailment.
+    The solver is rebuilt lazily after the knowledge base changes, so any
+    number of queries between additions share the same encoding.
+    """
+
+    def __init__(self, formulas=()):
+        self.formulas = []
+        self._solver = None
+        self._encoder = None
+        for formula in formulas:
+            self.add(formula)
+
+    def add(self, formula):
+        self.formulas.append(as_formula(formula))
+        self._solver = None
+
+    def __len__(self) -> int:
+        return len(self.formulas)
+
+    def _prepare(self):
+        if self._solver is None:
+            self._solver = Solver()
+            self._encoder = CnfEncoder(self._solver)
+            for formula in self.formulas:
+                self._solver.add_clause([self._encoder.literal(formula)])
+        return self._solver, self._encoder
+
+    # True if the formulas can all be true at once
+    def is_satisfiable(self) -> bool:
+        solver, _ = self._prepare()
+        return solver.solve()
+
+    # an assignment of the atoms that satisfies the knowledge base, or None if it is contradictory
+    def model(self) -> dict:
+        solver, encoder = self._prepare()
+        if not solver.solve():
+            return None
+        return encoder.atom_model(solver.model())
+
+    # an assignment where the knowledge base holds but the query is false,
+    # or None if the knowledge base entails the query
+    def counterexample(self, query) -> dict:
+        solver, encoder = self._prepare()
+        query_literal = encoder.literal(as_formula(query))
+        if not solver.solve(assumptions=[-query_literal]):
+            return None
+        return encoder.atom_model(solver.model())
+
+    # True if the query holds in every model of the knowledge base
+    def entails(self, query) -> bool:
+        return self.counterexample(query) is None
+
+
+class KnowledgeSession:
+    """
+    Incremental knowledge base for a running conversation.
+    One solver lives for the whole session: each turn only encodes its own
+    formulas, learned clauses carry over between turns, and queries are
+    answered under assumptions. A retractable turn is guarded by an activation
+    literal, so retract() switches it off without rebuilding anything.
+    """
+
+    def __init__(self, max_learnts: int = 20000):
+        self.solver = Solver(max_learnts=max_learnts)
+        self.encoder = CnfEncoder(self.solver)
+        self.turns = {}          # turn id -> (activation var or None, formulas)
+        self._active = []        # activation vars of the live retractable turns
+        self._next_turn = 0
+
+    # adds the formulas of one turn; returns the turn id used by retract()
+    # non-retractable turns are asserted directly and cost no assumption per query
+    def add_turn(self, formulas, retractable: bool = True) -> int:
+        formulas = [as_formula(formula) for formula in formulas]
+        activation = self.solver.new_var() if retractable else None
+        for formula in formulas:
+            literal = self.encoder.literal(formula)
+            if activation is None:
+                self.solver.add_clause([literal])
+            else:
+                self.solver.add_clause([-activation, literal])
+        if activation is not None:
+            self._active.append(activation)
+
+        turn_id = self._next_turn
+        self._next_turn += 1
+        self.turns[turn_id] = (activation, formulas)
+        return turn_id
+
+    # permanently switches a turn off; clauses learned while it was active stay valid
+    def retract(self, turn_id: int):
+        activation, _ = self.turns[turn_id]
+        if activation is None:
+            raise ValueError(f"turn {turn_id} was not added as retractable")
+        del self.turns[turn_id]
+        self._active.remove(activation)
+        self.solver.add_clause([-activation])
+
+    def is_satisfiable(self) -> bool:
+        return self.solver.solve(assumptions=self._active)
+
+    def model(self) -> dict:
+        if not self.solver.solve(assumptions=self._active):
+            return None
+        return self.encoder.atom_model(self.solver.model())
+
+    # an assignment where the live turns hold but the query is false, or None if entailed
+    def counterexample(self, query) -> dict:
+        query_literal = self.encoder.literal(as_formula(query))
+        if not self.solver.solve(assumptions=self._active + [-query_literal]):
+            return None
+        return self.encoder.atom_model(self.solver.model())
+
+    def entails(self, query) -> bool:
+        return self.counterexample(query) is None
+
+    def stats(self) -> dict:
+        return {
+            "turns": len(self.turns),
+            "variables": self.solver.num_vars,
+            "clauses": len(self.solver.clauses),
+            "learnts": len(self.solver.learnts),
+            "conflicts": self.solver.conflicts,
+        }
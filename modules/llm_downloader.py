@@ -1,28 +1,165 @@
+import http.client
+import io
+import json
 import os
+import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from modules.http_pool import HttpError, HttpPool
+from modules.logger import Logger
 from modules.time_decorators import timer
+
+MANIFEST_NAME = "pull_manifest.json"
+OLLAMA_PORT = 11434
+_ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+_PROGRESS = re.compile(r"^pulling (?P<digest>[0-9a-f]{6,}):?\s*(?:(?P<percent>\d+)%)?")
+_SIZES = re.compile(r"([\d.]+\s*[KMGT]?B)\s*/\s*([\d.]+\s*[KMGT]?B)")
+_UNITS = {"B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+
+
+@dataclass(frozen=True)
+class PullEvent:
+    """
+    One line of `ollama pull` output, parsed.
+    status is the phase ("pulling manifest", "pulling", "verifying sha256 digest",
+    "writing manifest", "success", ...) or, from pull_many itself,
+    "skipped" / "done" / "failed". Layer downloads carry digest and progress.
+    """
+    model: str
+    status: str
+    digest: str = None
+    percent: float = None
+    completed: int = None
+    total: int = None
+
+
+def _size(text: str) -> int:
+    number, unit = re.match(r"([\d.]+)\s*([KMGT]?B)", text).groups()
+    return int(float(number) * _UNITS[unit])
+
+
+# parses one line of `ollama pull` output (terminal control codes already removed)
+def parse_progress(model: str, line: str) -> PullEvent:
+    match = _PROGRESS.match(line)
+    if match is None:
+        return PullEvent(model, line)
+    percent = match.group("percent")
+    sizes = _SIZES.search(line, match.end())
+    completed, total = sizes.groups() if sizes else (None, None)
+    return PullEvent(
+        model, "pulling", digest=match.group("digest"),
+        percent=float(percent) if percent is not None else None,
+        completed=_size(completed) if completed else None,
+        total=_size(total) if total else None,
+    )
+
+
+# where ollama keeps the manifest of a model: manifests/<registry>/<namespace>/<name>/<tag>
+def manifest_path(models_dir: str, model: str) -> str:
+    name, _, tag = model.partition(":")
+    parts = name.split("/")
+    if len(parts) == 1:
+        parts = ["library"] + parts
+    if len(parts) == 2:
+        parts = ["registry.ollama.ai"] + parts
+    return os.path.join(models_dir, "manifests", *parts, tag or "latest")
+
+
 class OllamaManager:
+    # host defaults to $OLLAMA_HOST, then the local server; without a port it is ollama's 11434
+    # (OLLAMA_HOST=0.0.0.0 is a common setting), except for https urls (443, a proxy)
+    # health and status checks go over HTTP through a small pool of kept-alive connections
     @timer
-    def __init__(self, models_dir: str):
+    def __init__(self, models_dir: str, host: str = None, timeout: float = 5.0):
         self.models_dir = os.path.abspath(models_dir)
         os.makedirs(self.models_dir, exist_ok=True)
 
         # Set env var for this process
         os.environ["OLLAMA_MODELS"] = self.models_dir
 
+        self.host = host or os.environ.get("OLLAMA_HOST") or "http://127.0.0.1:11434"
+        self.timeout = timeout
+        https = self.host.startswith("https://")
+        self.client = HttpPool(self.host, timeout=timeout, default_port=None if https else OLLAMA_PORT)
+        self._keep_alive_thread = None
+        self._keep_alive_stop = threading.Event()
+
+    # one HTTP round trip instead of spawning `ollama list`
     def is_ollama_running(self) -> bool:
         try:
-            subprocess.run(
-                ["ollama", "list"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True,
-            )
-            return True
-        except subprocess.CalledProcessError:
+            status, _ = self.client.request("GET", "/", timeout=self.timeout)
+            return status == 200
+        except (OSError, http.client.HTTPException):
+            # refused / timed out, or something that is not an HTTP server listening there
             return False
-        except FileNotFoundError:
-            raise RuntimeError("Ollama not installed or not in PATH")
+
+    # server version, loaded models (with their expiry) and locally available models
+    # raises OSError when the server is not reachable
+    def status(self) -> dict:
+        return {
+            "host": self.client.url,
+            "version": self.client.json("GET", "/api/version").get("version"),
+            "running": self.running_models(),
+            "available": [model["name"] for model in self.client.json("GET", "/api/tags").get("models", [])],
+        }
+
+    # models currently loaded in memory, as reported by /api/ps
+    def running_models(self) -> list:
+        return self.client.json("GET", "/api/ps").get("models", [])
+
+    def is_loaded(self, model: str) -> bool:
+        return any(entry.get("name") == model or entry.get("model") == model for entry in self.running_models())
+
+    # loads the model into memory without generating anything, so the first real
+    # request does not pay for the load; keep_alive is how long it stays loaded
+    # ("30m", "1h", seconds as a number, -1 forever)
+    # returns the seconds the server spent loading (0 when it was already loaded)
+    @timer
+    def warm_up(self, model: str, keep_alive="30m", timeout: float = 600.0) -> float:
+        return self._load(model, keep_alive, timeout).get("load_duration", 0) / 1e9
+
+    # unloads the model right away
+    def unload(self, model: str):
+        self._load(model, 0, self.timeout)
+
+    # a generate request without a prompt only (re)loads the model and sets its keep_alive
+    def _load(self, model: str, keep_alive, timeout: float) -> dict:
+        return self.client.json("POST", "/api/generate", {"model": model, "keep_alive": keep_alive},
+                                timeout=timeout)
+
+    # re-warms the models every `interval` seconds on a background thread, so they
+    # are never unloaded while idle (and are reloaded if the server restarted)
+    def start_keep_alive(self, models, keep_alive="30m", interval: float = 60.0):
+        self.stop_keep_alive()
+        self._keep_alive_stop.clear()
+        models = [models] if isinstance(models, str) else list(models)
+
+        def run():
+            while True:
+                for model in models:
+                    try:
+                        self._load(model, keep_alive, 600.0)
+                    except (OSError, http.client.HTTPException, HttpError) as error:
+                        Logger.warn(f"Keep-alive for {model} failed: {error}")
+                if self._keep_alive_stop.wait(interval):
+                    return
+
+        self._keep_alive_thread = threading.Thread(target=run, name="OllamaKeepAlive", daemon=True)
+        self._keep_alive_thread.start()
+
+    def stop_keep_alive(self):
+        if self._keep_alive_thread is not None:
+            self._keep_alive_stop.set()
+            self._keep_alive_thread.join()
+            self._keep_alive_thread = None
+
+    def close(self):
+        self.stop_keep_alive()
+        self.client.close()
+
     @timer
     def pull(self, model: str):
         print(f"Pulling {model} into {self.models_dir}")
@@ -32,5 +169,95 @@ class OllamaManager:
             env=os.environ,
         )
 
+    # is the model already in models_dir
+    def is_pulled(self, model: str) -> bool:
+        return os.path.isfile(manifest_path(self.models_dir, model))
+
+    # pulls several models, at most max_concurrency at a time
+    # - models already in models_dir are skipped
+    # - progress is parsed into PullEvents and handed to on_event (from worker threads)
+    # - the state of every model is kept in models_dir/pull_manifest.json, so an
+    #   interrupted run picks up where it stopped (ollama itself resumes partial layers);
+    #   models=None pulls whatever the manifest still lists as unfinished
+    # returns model -> "skipped" | "done" | "failed: <reason>"
+    @timer
+    def pull_many(self, models=None, max_concurrency: int = 2, on_event=None) -> dict:
+        models = list(dict.fromkeys(self.pending_pulls() if models is None else models))
+        on_event = on_event or self._log_event
+        manifest = self._read_manifest()
+        lock = threading.Lock()
+
+        def record(model, state, error=None):
+            with lock:
+                manifest[model] = {"state": state, "error": error, "updated": time.time()}
+                self._write_manifest(manifest)
+
+        def run(model):
+            if self.is_pulled(model):
+                record(model, "done")
+                on_event(PullEvent(model, "skipped"))
+                return "skipped"
+            record(model, "pulling")
+            try:
+                error = self._pull_process(model, on_event)
+            except OSError as exc:
+                error = str(exc)
+            if error is None:
+                record(model, "done")
+                on_event(PullEvent(model, "done"))
+                return "done"
+            record(model, "failed", error)
+            on_event(PullEvent(model, "failed"))
+            return f"failed: {error}"
+
+        for model in models:
+            if manifest.get(model, {}).get("state") != "done":
+                record(model, "pending")
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            return dict(zip(models, pool.map(run, models)))
+
+    # models the manifest does not list as done (what a resumed run still has to pull)
+    def pending_pulls(self) -> list:
+        return [model for model, entry in self._read_manifest().items() if entry.get("state") != "done"]
+
+    # runs `ollama pull` for one model, returns None on success or the error message
+    def _pull_process(self, model: str, on_event):
+        process = subprocess.Popen(
+            ["ollama", "pull", model],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=os.environ,
+        )
+        last = None
+        # progress lines are redrawn with \r, newline="" splits on those as well
+        with io.TextIOWrapper(process.stdout, encoding="utf-8", errors="replace", newline="") as output:
+            for raw in output:
+                line = _ANSI.sub("", raw).strip()
+                if line:
+                    last = line
+                    on_event(parse_progress(model, line))
+        if process.wait() != 0:
+            return last or f"ollama pull exited with {process.returncode}"
+        return None
+
+    @staticmethod
+    def _log_event(event: PullEvent):
+        if event.percent is None:
+            Logger.info(f"{event.model}: {event.status}")
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.models_dir, MANIFEST_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: dict):
+        path = os.path.join(self.models_dir, MANIFEST_NAME)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temporary, path)
+
     def list_models(self):
         subprocess.run(["ollama", "list"], check=True)
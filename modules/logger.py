@@ -1,5 +1,6 @@
 import sys
 from datetime import datetime
+from modules.file_sink import BufferedFileSink
 
 class Logger:
     """
@@ -18,11 +19,29 @@ class Logger:
     
     # Static configuration
     _file_path = None
+    _sink = None
 
     @staticmethod
-    def setup_file(path):
-        """Enable file logging by setting a file path."""
+    def setup_file(path, buffered=True, **sink_options):
+        """
+        Enable file logging by setting a file path (None disables it).
+        By default lines go through a BufferedFileSink that keeps the file open
+        and writes in the background; sink_options are passed on to it
+        (flush_bytes, flush_interval, queue_size, max_bytes, backup_count).
+        buffered=False reopens the file for every message.
+        """
+        if Logger._sink is not None:
+            Logger._sink.close()
+            Logger._sink = None
         Logger._file_path = path
+        if path and buffered:
+            Logger._sink = BufferedFileSink(path, **sink_options)
+
+    @staticmethod
+    def flush():
+        """Write out buffered file logs."""
+        if Logger._sink is not None:
+            Logger._sink.flush()
 
     @staticmethod
     def _output(color, args, kwargs):
@@ -47,6 +66,9 @@ class Logger:
                 return
 
             timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+            if Logger._sink is not None:
+                Logger._sink.write(f"{timestamp} {message}\n")
+                return
             try:
                 with open(Logger._file_path, "a", encoding="utf-8") as f:
                     f.write(f"{timestamp} {message}\n")
@@ -0,0 +1,266 @@
+import functools
+import re
+import threading
+import weakref
+
+ATOM = "ATOM"
+NOT = "NOT"
+AND = "AND"
+OR = "OR"
+IMPLY = "IMPLY"
+
+
+class LogicSyntaxError(ValueError):
+    """Raised when an expression is not in the AND/OR/NOT/IMPLY language."""
+
+
+class Formula:
+    """
+    Immutable, hash-consed propositional formula.
+    Structurally equal formulas are the same object, so == and hash() are O(1)
+    identity checks and shared subformulas are stored once. Build them with
+    atom(), negate(), conjoin(), disjoin(), implies() or parse().
+    """
+
+    __slots__ = ("op", "name", "children", "uid", "__weakref__")
+
+    # live nodes keyed by structure; entries vanish when nothing references the node
+    _table = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+    _next_uid = 0
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Formula is immutable")
+
+    @classmethod
+    def _intern(cls, op, name, children):
+        # children are interned already, so their ids identify their structure
+        key = (op, name, tuple(id(child) for child in children))
+        with cls._lock:
+            node = cls._table.get(key)
+            if node is None:
+                node = object.__new__(cls)
+                object.__setattr__(node, "op", op)
+                object.__setattr__(node, "name", name)
+                object.__setattr__(node, "children", children)
+                object.__setattr__(node, "uid", cls._next_uid)
+                cls._next_uid += 1
+                cls._table[key] = node
+            return node
+
+    def __reduce__(self):
+        # unpickling goes through the intern table again
+        if self.op == ATOM:
+            return (atom, (self.name,))
+        return (_make, (self.op, self.children))
+
+    def is_atom(self) -> bool:
+        return self.op == ATOM
+
+    # distinct subformulas, children before parents (each shared node once)
+    def subformulas(self) -> list:
+        order = []
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+                continue
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.append((node, True))
+            for child in reversed(node.children):
+                if child not in seen:
+                    stack.append((child, False))
+        return order
+
+    # names of the atoms used in the formula
+    def atoms(self) -> frozenset:
+        return frozenset(node.name for node in self.subformulas() if node.op == ATOM)
+
+    # the same formula with atoms renamed by mapping (names not in it are kept)
+    def rename(self, mapping: dict) -> "Formula":
+        renamed = {}
+        for node in self.subformulas():
+            if node.op == ATOM:
+                renamed[node] = atom(mapping.get(node.name, node.name))
+            else:
+                renamed[node] = _make(node.op, tuple(renamed[child] for child in node.children))
+        return renamed[self]
+
+    # truth value under an assignment of atom name -> bool (missing atoms are False)
+    def evaluate(self, assignment: dict) -> bool:
+        values = {}
+        for node in self.subformulas():
+            if node.op == ATOM:
+                values[node] = bool(assignment.get(node.name, False))
+            elif node.op == NOT:
+                values[node] = not values[node.children[0]]
+            else:
+                left, right = values[node.children[0]], values[node.children[1]]
+                if node.op == AND:
+                    values[node] = left and right
+                elif node.op == OR:
+                    values[node] = left or right
+                else:
+                    values[node] = (not left) or right
+        return values[self]
+
+    # renders in the turn_into_logic style, parenthesizing every nested binary
+    # connective except left-leaning AND/OR chains
+    def __str__(self) -> str:
+        text = {}
+        for node in self.subformulas():
+            if node.op == ATOM:
+                text[node] = node.name
+            elif node.op == NOT:
+                text[node] = f"NOT {_wrap(node.children[0], text)}"
+            else:
+                left, right = node.children
+                chained = left.op == node.op and node.op in (AND, OR)
+                left_text = text[left] if chained else _wrap(left, text)
+                text[node] = f"{left_text} {node.op} {_wrap(right, text)}"
+        return text[self]
+
+    def __repr__(self) -> str:
+        return f"Formula({str(self)!r})"
+
+
+def _wrap(node, text):
+    if node.op in (ATOM, NOT):
+        return text[node]
+    return f"({text[node]})"
+
+
+def _make(op, children):
+    for child in children:
+        if not isinstance(child, Formula):
+            raise TypeError(f"expected Formula, got {type(child).__name__}")
+    return Formula._intern(op, None, tuple(children))
+
+
+def atom(name: str) -> Formula:
+    return Formula._intern(ATOM, name, ())
+
+
+def negate(formula: Formula) -> Formula:
+    return _make(NOT, (formula,))
+
+
+def conjoin(left: Formula, right: Formula) -> Formula:
+    return _make(AND, (left, right))
+
+
+def disjoin(left: Formula, right: Formula) -> Formula:
+    return _make(OR, (left, right))
+
+
+def implies(left: Formula, right: Formula) -> Formula:
+    return _make(IMPLY, (left, right))
+
+
+# --- parser ---
+# grammar (loosest to tightest):
+#   implication := disjunction [ (IMPLY | ->) implication ]
+#   disjunction := conjunction { OR conjunction }
+#   conjunction := negation { AND negation }
+#   negation    := NOT negation | "(" implication ")" | Atom
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|(->)|([A-Za-z_][A-Za-z0-9_]*)|(\S))")
+_KEYWORDS = {"AND": AND, "OR": OR, "NOT": NOT, "IMPLY": IMPLY, "IMPLIES": IMPLY}
+
+
+def _tokenize(text: str) -> list:
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        lparen, rparen, arrow, word, other = match.groups()
+        position = match.start(match.lastindex)
+        if other is not None:
+            raise LogicSyntaxError(f"unexpected character {other!r} at {position}")
+        if lparen or rparen:
+            tokens.append((lparen or rparen, None, position))
+        elif arrow:
+            tokens.append((IMPLY, None, position))
+        elif word in _KEYWORDS:
+            tokens.append((_KEYWORDS[word], None, position))
+        else:
+            tokens.append((ATOM, word, position))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][0]
+        return None
+
+    def expect(self, kind):
+        if self.peek() != kind:
+            self.fail(f"expected {kind}")
+        self.pos += 1
+
+    def fail(self, message):
+        if self.pos < len(self.tokens):
+            kind, value, position = self.tokens[self.pos]
+            found = value or kind
+            raise LogicSyntaxError(f"{message} but found {found!r} at {position} in {self.text!r}")
+        raise LogicSyntaxError(f"{message} but the expression ended: {self.text!r}")
+
+    def parse(self):
+        if not self.tokens:
+            raise LogicSyntaxError("empty expression")
+        formula = self.implication()
+        if self.pos != len(self.tokens):
+            self.fail("expected end of expression")
+        return formula
+
+    def implication(self):
+        left = self.disjunction()
+        if self.peek() == IMPLY:
+            self.pos += 1
+            return implies(left, self.implication())
+        return left
+
+    def disjunction(self):
+        left = self.conjunction()
+        while self.peek() == OR:
+            self.pos += 1
+            left = disjoin(left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek() == AND:
+            self.pos += 1
+            left = conjoin(left, self.negation())
+        return left
+
+    def negation(self):
+        kind = self.peek()
+        if kind == NOT:
+            self.pos += 1
+            return negate(self.negation())
+        if kind == "(":
+            self.pos += 1
+            inner = self.implication()
+            self.expect(")")
+            return inner
+        if kind == ATOM:
+            name = self.tokens[self.pos][1]
+            self.pos += 1
+            return atom(name)
+        self.fail("expected an atom, NOT or '('")
+
+
+# parses an expression in the turn_into_logic language into a Formula
+# results are memoized; formulas are immutable so sharing them is safe
+@functools.lru_cache(maxsize=4096)
+def parse(text: str) -> Formula:
+    return _Parser(text).parse()
@@ -0,0 +1,209 @@
+import json
+from dataclasses import dataclass, field
+from modules.definition_parser import EXPRESSION_MARKER, clean_line, iter_definitions, parse_line
+from modules.logic_ast import Formula, LogicSyntaxError, parse
+from modules.stream_stats import StreamStats
+
+
+class MalformedOutputError(ValueError):
+    """Raised when the llm output does not follow the turn_into_logic format."""
+
+
+@dataclass(frozen=True)
+class LogicResult:
+    """
+    The llm output parsed once into its two sections.
+    - definitions: atom name -> natural language description
+    - expression: the logic form expression
+    - formula: the expression parsed into a hash-consed Formula
+    - stats: StreamStats of the llm call that produced it; None when the result
+      came from the cache (not serialized, not compared)
+    """
+    definitions: dict = field(default_factory=dict)
+    expression: str = ""
+    stats: StreamStats = field(default=None, compare=False, repr=False)
+
+    # bump when the serialized layout changes so stale cache entries are not reused
+    FORMAT = "logic-result-v1"
+
+    @property
+    def formula(self) -> Formula:
+        # parse() is memoized, so this is a dict lookup after the first call
+        return parse(self.expression)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"definitions": self.definitions, "expression": self.expression},
+            ensure_ascii=False,
+        )
+
+    @staticmethod
+    def from_json(text: str) -> "LogicResult":
+        data = json.loads(text)
+        return LogicResult(data["definitions"], data["expression"])
+
+
+# parses "Name: description" lines into a dict, skipping anything that is not a definition
+def parse_definitions(text: str) -> dict:
+    return dict(iter_definitions(text))
+
+
+# parses a raw llm output into a LogicResult
+# raises MalformedOutputError when there is no usable expression
+# or when the expression is not in the AND/OR/NOT/IMPLY language
+def parse_output(raw: str) -> LogicResult:
+    if EXPRESSION_MARKER not in raw:
+        raise MalformedOutputError(f"missing '{EXPRESSION_MARKER}' section")
+    head, _, tail = raw.partition(EXPRESSION_MARKER)
+
+    # the expression is the first non-empty block after the marker; like OutputStreamParser
+    # it also ends before a line that cannot continue an already complete expression
+    # ("Note: ..." and other remarks the model adds)
+    lines = []
+    complete = False
+    for line in tail.strip().splitlines():
+        line = _expression_line(line)
+        if not line:
+            if lines:
+                break
+            continue
+        if complete and not _continues(line, final=True):
+            break
+        lines.append(line)
+        complete = _parses(" ".join(lines))
+    expression = " ".join(lines)
+    if not expression:
+        raise MalformedOutputError("empty logic form expression")
+    try:
+        parse(expression)
+    except LogicSyntaxError as error:
+        raise MalformedOutputError(f"invalid logic form expression: {error}") from error
+
+    return LogicResult(parse_definitions(head), expression)
+
+
+class OutputStreamParser:
+    """
+    Incremental parser over the llm stream, fed chunk by chunk.
+    - feed() returns the definitions completed by that chunk, so they can be
+      used (e.g. stored) before the response is finished.
+    - complete turns True once the expression is known to be finished: its
+      parentheses balance, it parses, and it is followed by a blank line, the
+      end of the stream or a line that cannot continue it (one not starting
+      with AND / OR / IMPLY). end is then the length of the useful output
+      (everything after it is rambling the model added), so cutting there
+      gives the same expression as parse_output on the whole output.
+    """
+
+    def __init__(self):
+        self.complete = False
+        self.end = None
+        self.length = 0            # characters fed so far
+        self._pending = []         # pieces of the current, unfinished line
+        self._in_expression = False
+        self._expression = []      # expression lines seen so far
+        self._candidate = None     # end of the last line at which the expression parsed
+
+    def feed(self, chunk: str) -> list:
+        if self.complete or not chunk:
+            return []
+        start = self.length
+        self.length += len(chunk)
+        if "\n" not in chunk:
+            self._pending.append(chunk)
+            return []
+
+        pairs = []
+        lines = chunk.split("\n")
+        self._pending.append(lines[0])
+        lines[0] = "".join(self._pending)
+        self._pending = [lines[-1]]
+        # offset just past the newline ending each complete line
+        offset = start + len(chunk) - len(lines[-1])
+        ends = []
+        for line in reversed(lines[1:-1]):
+            ends.append(offset)
+            offset -= len(line) + 1
+        ends.append(offset)
+        for line, end in zip(lines[:-1], reversed(ends)):
+            pairs.extend(self._line(line, end))
+            if self.complete:
+                return pairs
+        # the unfinished line may already show that it does not continue the expression
+        if self._candidate is not None and _continues(clean_line(lines[-1]), final=False) is False:
+            self._finish(self._candidate)
+        return pairs
+
+    # handles whatever is left after the last newline (end of the stream)
+    def close(self) -> list:
+        if self.complete:
+            return []
+        line = "".join(self._pending)
+        self._pending = []
+        pairs = self._line(line, self.length)
+        if not self.complete and self._candidate is not None:
+            self._finish(self._candidate)
+        return pairs
+
+    def _line(self, line: str, end: int) -> list:
+        if not self._in_expression:
+            if EXPRESSION_MARKER not in line:
+                return parse_line(line)
+            self._in_expression = True
+            line = line.partition(EXPRESSION_MARKER)[2]
+        line = _expression_line(line)
+        if not line:
+            if self._expression:
+                self._finish(self._candidate if self._candidate is not None else end)
+            return []
+        if self._candidate is not None and not _continues(line, final=True):
+            self._finish(self._candidate)
+            return []
+        self._expression.append(line)
+        self._candidate = None
+        if _parses(" ".join(self._expression)):
+            self._candidate = end
+        return []
+
+    def _finish(self, end: int):
+        self.complete = True
+        self.end = end
+
+
+# one line of the expression block, without list markers, markdown and a closing period
+# (models often end the expression like a sentence: "A AND B.")
+def _expression_line(line: str) -> str:
+    return clean_line(line).rstrip(".").rstrip()
+
+
+def _parses(expression: str) -> bool:
+    if expression.count("(") != expression.count(")"):
+        return False
+    try:
+        parse(expression)
+    except LogicSyntaxError:
+        return False
+    return True
+
+
+# binary operators a line may start with to continue the expression above it
+_CONTINUATIONS = ("AND", "OR", "IMPLY", "IMPLIES")
+
+
+# whether a (cleaned) line continues a complete expression: True or False,
+# or None when an unfinished line is too short to tell ("AN" may become "AND")
+def _continues(line: str, final: bool):
+    if not line:
+        return None
+    undecided = False
+    for keyword in _CONTINUATIONS:
+        if line.startswith(keyword):
+            rest = line[len(keyword):]
+            if rest and (rest[0].isalnum() or rest[0] == "_"):
+                continue            # an atom such as ORANGE_IS_RIPE
+            if rest or final:
+                return True
+            undecided = True
+        elif keyword.startswith(line):
+            undecided = True
+    return None if undecided and not final else False
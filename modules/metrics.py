@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import threading
+
+
+class Histogram:
+    """
+    HDR-style histogram with log-linear buckets.
+    Values are scaled to integers (scale=1e6 turns seconds into microseconds)
+    and bucketed with SIGNIFICANT_BITS of precision, so any value lands in a
+    bucket at most ~1% wide whatever its magnitude. Memory grows with the
+    number of distinct buckets, not with the number of samples.
+    """
+
+    SIGNIFICANT_BITS = 7
+
+    def __init__(self, scale: float = 1e6):
+        self.scale = scale
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._buckets = {}
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        shift = value.bit_length() - cls.SIGNIFICANT_BITS
+        if shift <= 0:
+            return value
+        half = 1 << (cls.SIGNIFICANT_BITS - 1)
+        return shift * half + (value >> shift)
+
+    @classmethod
+    def _bounds(cls, index: int) -> tuple:
+        half = 1 << (cls.SIGNIFICANT_BITS - 1)
+        if index < 2 * half:
+            return index, index
+        shift = index // half - 1
+        low = (index - shift * half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: float):
+        scaled = max(0, int(value * self.scale))
+        index = self._index(scaled)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    # value at percentile p (0-100), estimated as the middle of its bucket
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                low, high = self._bounds(index)
+                return min(max((low + high) / 2.0 / self.scale, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics.
+    - timers: calls, errors and a latency histogram per function (fed by @timer)
+    - counters: plain monotonically increasing numbers
+    - observations: histograms of arbitrary values (sizes, rates, ...)
+    When disabled, record/increment/observe return immediately and @timer
+    skips the bookkeeping entirely.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+        self._observations = {}
+        self._exporter = None
+        self._stop = threading.Event()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self._observations.clear()
+
+    # one call of a timed function
+    def record(self, name: str, seconds: float, error: bool = False):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._timers.get(name)
+            if stats is None:
+                stats = self._timers[name] = {"calls": 0, "errors": 0, "latency": Histogram(1e9)}
+            stats["calls"] += 1
+            if error:
+                stats["errors"] += 1
+            stats["latency"].record(seconds)
+
+    def increment(self, name: str, amount: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float, scale: float = 1e3):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._observations.get(name)
+            if histogram is None:
+                histogram = self._observations[name] = Histogram(scale)
+            histogram.record(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timers": {
+                    name: {"calls": stats["calls"], "errors": stats["errors"],
+                           "latency_seconds": stats["latency"].summary()}
+                    for name, stats in self._timers.items()
+                },
+                "counters": dict(self._counters),
+                "observations": {name: h.summary() for name, h in self._observations.items()},
+            }
+
+    # --- export ---
+
+    def export_json(self, path: str):
+        _write_atomic(path, json.dumps(self.snapshot(), indent=2, sort_keys=True))
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+
+        def summary(metric, label, name, stats):
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f'{metric}{{{label}="{_escape(name)}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'{metric}_sum{{{label}="{_escape(name)}"}} {stats["sum"]}')
+            lines.append(f'{metric}_count{{{label}="{_escape(name)}"}} {stats["count"]}')
+
+        if snapshot["timers"]:
+            lines.append("# TYPE llm_logic_function_calls_total counter")
+            for name, stats in sorted(snapshot["timers"].items()):
+                lines.append(f'llm_logic_function_calls_total{{function="{_escape(name)}"}} {stats["calls"]}')
+            lines.append("# TYPE llm_logic_function_errors_total counter")
+            for name, stats in sorted(snapshot["timers"].items()):
+                lines.append(f'llm_logic_function_errors_total{{function="{_escape(name)}"}} {stats["errors"]}')
+            lines.append("# TYPE llm_logic_function_latency_seconds summary")
+            for name, stats in sorted(snapshot["timers"].items()):
+                summary("llm_logic_function_latency_seconds", "function", name, stats["latency_seconds"])
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"llm_logic_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, stats in sorted(snapshot["observations"].items()):
+            metric = f"llm_logic_{_metric_name(name)}"
+            lines.append(f"# TYPE {metric} summary")
+            summary(metric, "metric", name, stats)
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: str):
+        _write_atomic(path, self.to_prometheus())
+
+    # writes the enabled exports every `interval` seconds on a background thread
+    def start_exporter(self, json_path: str = None, prometheus_path: str = None, interval: float = 10.0):
+        self.stop_exporter()
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self._export(json_path, prometheus_path)
+            self._export(json_path, prometheus_path)
+
+        self._exporter = threading.Thread(target=run, name="MetricsExporter", daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self):
+        if self._exporter is not None:
+            self._stop.set()
+            self._exporter.join()
+            self._exporter = None
+
+    def _export(self, json_path, prometheus_path):
+        if json_path:
+            self.export_json(json_path)
+        if prometheus_path:
+            self.export_prometheus(prometheus_path)
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name).lower()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# readers never see a half written file
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+# the registry @timer reports to
+registry = MetricsRegistry()
@@ -1,49 +1,318 @@
+import asyncio
+from dataclasses import replace
 from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from modules.app_tools import turn_into_logic
-from modules.logger import Logger
+from modules.backend_router import Backend, BackendRouter
+from modules.http_pool import HttpPool
+from modules.llm_downloader import OLLAMA_PORT
+from modules.logic_result import LogicResult, OutputStreamParser, parse_output
+from modules import metrics
+from modules.response_cache import ResponseCache
+from modules.single_flight import Abandoned, SingleFlight
+from modules.stream_sinks import ConsoleSink, StreamSink
+from modules.stream_stats import StreamMeter
 from modules.time_decorators import timer
+# (model name, provider) of an injected llm for the cache key: its type and model when it has
+# one, otherwise the instance itself, since a fake or custom model has nothing stable to share
+# cache entries (or in-flight generations) by
+def llm_identity(llm) -> tuple:
+    kind = type(llm)
+    provider = f"{kind.__module__}.{kind.__qualname__}"
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None)
+    if not isinstance(model, str) or not model:
+        model = f"instance-{id(llm):x}"
+    return model, provider
+
+
+# health check of a model server: it answers HTTP at all (ollama answers "/" with 200)
+def _health_probe(url: str):
+    pool = HttpPool(url, size=1, timeout=2.0,
+                    default_port=None if url.startswith("https://") else OLLAMA_PORT)
+
+    def probe() -> bool:
+        status, _ = pool.request("GET", "/")
+        return status < 500
+    return probe
+
+
 class ModelInterface:
-    outputs = {}
+    # generations in progress, shared by all instances (keys cover model, prompt and statement)
+    # concurrent get_result / aget_result calls with the same key wait for one generation
+    _flights = SingleFlight()
+    # seconds between health probes of the endpoints
+    HEALTH_INTERVAL = 10.0
+
     # initializes the model interface with the specified model and prompt
     # defaults to qwen2.5:7b from ollama with temperature 0
+    # responses are cached on disk in cache_path (None keeps them in memory only)
+    # streamed output goes to sink (live console by default, see modules.stream_sinks)
+    # llm replaces the chat model built from model_name/model_provider_ (e.g. a fake for benchmarks);
+    # the cache keys then name that llm instead (see llm_identity)
+    # endpoints spreads requests over several model servers (see modules.backend_router); each entry
+    # is a base url or a dict with "url" and optionally "model" and "max_concurrency"; every server
+    # gets its own client (llm and the default client are not used) and is health-checked
+    # early_stop cuts the stream as soon as the logic form expression is complete (off by default)
+    # stop is an optional list of server-side stop sequences
     @timer
-    def __init__(self , model_name: str = "qwen2.5:7b", model_provider_: str = "ollama", temperature: int = 0):
-        self.llm = init_chat_model(
-            model=model_name, 
-            model_provider=model_provider_, 
-            temperature=0
-        )
+    def __init__(self , model_name: str = "qwen2.5:7b", model_provider_: str = "ollama", temperature: int = 0,
+                 cache_path: str = "cache/responses.db", cache_max_bytes: int = 64 * 1024 * 1024,
+                 sink: StreamSink = None, llm=None, endpoints=None, early_stop: bool = False, stop: list = None):
+        self.model_name = model_name
+        self.model_provider = model_provider_
+        self.temperature = temperature
+        self.early_stop = early_stop
+        self.stop = list(stop) if stop else None
 
+        self.system_prompt = turn_into_logic()
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", turn_into_logic()),
+            ("system", self.system_prompt),
             ("user", "{statement}")
         ])
 
-        self.chain = self.prompt | self.llm | StrOutputParser()
-    
+        self.llm = None
+        self.router = None
+        if endpoints:
+            self.router = self._build_router(endpoints)
+            self.chain = self.router
+        else:
+            if llm is None:
+                llm = init_chat_model(
+                    model=model_name,
+                    model_provider=model_provider_,
+                    temperature=temperature
+                )
+            else:
+                self.model_name, self.model_provider = llm_identity(llm)
+            if self.stop:
+                llm = llm.bind(stop=self.stop)
+            self.llm = llm
+            self.chain = self.prompt | self.llm | StrOutputParser()
+        self.sink = sink if sink is not None else ConsoleSink()
+        # StreamStats of the most recent process_statement call
+        self.last_stats = None
+        # outputs holds parsed LogicResults, so cached statements are never re-parsed
+        self.outputs = ResponseCache(
+            cache_path, max_bytes=cache_max_bytes,
+            encode=LogicResult.to_json, decode=LogicResult.from_json
+        )
+
+    # one backend per endpoint, all sharing the prompt and output parser
+    def _build_router(self, endpoints) -> BackendRouter:
+        backends = []
+        for endpoint in endpoints:
+            if isinstance(endpoint, str):
+                endpoint = {"url": endpoint}
+            model = endpoint.get("model", self.model_name)
+            llm = init_chat_model(
+                model=model,
+                model_provider=self.model_provider,
+                temperature=self.temperature,
+                base_url=endpoint["url"]
+            )
+            if self.stop:
+                llm = llm.bind(stop=self.stop)
+            backends.append(Backend(
+                f"{model}@{endpoint['url']}", self.prompt | llm | StrOutputParser(),
+                max_concurrency=endpoint.get("max_concurrency", 1), model=model,
+                health=_health_probe(endpoint["url"])
+            ))
+        return BackendRouter(backends, health_interval=self.HEALTH_INTERVAL)
     # returns the llm output
-    # prints the output in green as it streams
+    # hands the output to the sink as it streams
+    # timings of the call (time to first chunk, tokens/sec, ...) are kept in last_stats
+    # (a convenience for direct callers; concurrent calls overwrite each other's)
+    # on_chunk, if given, also receives every chunk
+    # on_definition(name, description) is called for every definition as soon as its line is complete
+    def process_statement(self, statement: str, on_chunk=None, on_definition=None) -> str:
+        text, self.last_stats = self.generate(statement, on_chunk, on_definition)
+        return text
+    # process_statement returning (text, StreamStats) instead of keeping the stats on the instance
     @timer
-    def process_statement(self, statement: str) -> str:
-        result = ""
-        for chunk in self.chain.stream({"statement": statement}):
-            Logger.log(chunk, end="");   
-            result += chunk
-        return result
-    # extracts and returns only the logic form expression from the llm output
-    def get_expression(self, statement: str) -> str:
-        if(statement in self.outputs):
-            return self.outputs[statement].split("Logic Form Expression:", 1)[1].strip()
-        else:
-            self.outputs[statement] = self.process_statement(statement)
-        return self.outputs[statement].split("Logic Form Expression:", 1)[1].strip()
-    # extracts and returns only the definitions
-    # if it is already in database, it will return the existing definitions
-    def get_definitions(self, statement: str) -> str:
-        if(statement in self.outputs):
-            return self.outputs[statement].split("Logic Form Expression:", 1)[0].strip()
+    def generate(self, statement: str, on_chunk=None, on_definition=None) -> tuple:
+        return self._stream(statement, on_chunk, on_definition)
+    # streams one response to the sink, returns the text and its StreamStats
+    # with early_stop the stream is closed (aborting the request) once the expression is complete
+    def _stream(self, statement: str, on_chunk=None, on_definition=None) -> tuple:
+        meter = StreamMeter(self.system_prompt + statement, statement)
+        parser = OutputStreamParser()
+        chunks = []
+        stopped = False
+        stream = self.chain.stream({"statement": statement})
+        try:
+            for chunk in stream:
+                meter.chunk(chunk)
+                chunks.append(chunk)
+                chunk = self._parse_chunk(parser, chunk, on_definition)
+                self.sink.write(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+                if self.early_stop and parser.complete:
+                    stopped = True
+                    break
+        finally:
+            stream.close()
+        self._parse_chunk(parser, None, on_definition)
+        self.sink.flush()
+        return self._cut(chunks, parser), meter.finish(stopped_early=stopped)
+    # feeds the parser, returns the chunk cut at the end of the expression when stopping early
+    # (the end can lie in an earlier chunk, then nothing of this one is returned)
+    # chunk None closes the parser (end of stream)
+    def _parse_chunk(self, parser, chunk, on_definition):
+        if chunk is None:
+            pairs = parser.close()
         else:
-            self.outputs[statement] = self.process_statement(statement)
-        return self.outputs[statement].split("Logic Form Expression:", 1)[0].strip()
\ No newline at end of file
+            pairs = parser.feed(chunk)
+        if on_definition is not None:
+            for name, description in pairs:
+                on_definition(name, description)
+        if chunk is not None and self.early_stop and parser.complete:
+            chunk = chunk[:max(0, len(chunk) - (parser.length - parser.end))]
+        return chunk
+    # the output of a stream: with early_stop everything after the expression is dropped
+    def _cut(self, chunks, parser) -> str:
+        text = "".join(chunks)
+        if self.early_stop and parser.complete:
+            text = text[:parser.end]
+        return text
+    # async version of process_statement
+    # nothing is printed because concurrent streams would interleave on the console
+    # raises asyncio.TimeoutError when timeout (seconds) runs out; cancelling the task
+    # closes the stream, which aborts the request to the model server
+    async def aprocess_statement(self, statement: str, timeout: float = None) -> str:
+        text, _ = await self._astream(statement, timeout)
+        return text
+    # async version of _stream
+    async def _astream(self, statement: str, timeout: float = None) -> tuple:
+        async def collect():
+            meter = StreamMeter(self.system_prompt + statement, statement)
+            parser = OutputStreamParser()
+            chunks = []
+            stopped = False
+            stream = self.chain.astream({"statement": statement})
+            try:
+                async for chunk in stream:
+                    meter.chunk(chunk)
+                    chunks.append(chunk)
+                    self._parse_chunk(parser, chunk, None)
+                    if self.early_stop and parser.complete:
+                        stopped = True
+                        break
+            finally:
+                await stream.aclose()
+            self._parse_chunk(parser, None, None)
+            return self._cut(chunks, parser), meter.finish(stopped_early=stopped)
+        return await asyncio.wait_for(collect(), timeout)
+    # async version of get_result
+    # timeout is this caller's own deadline: a coalesced call whose leader timed out (on a
+    # shorter timeout of its own) retries within the time it has left
+    async def aget_result(self, statement: str, timeout: float = None) -> LogicResult:
+        key = self.cache_key(statement)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            result = self.outputs.get(key)
+            if result is not None:
+                return result
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            flight, leader = self._flights.begin(key)
+            if not leader:
+                metrics.registry.increment("singleflight.coalesced")
+                try:
+                    return await asyncio.wait_for(flight.aresult(), remaining)
+                except Abandoned:
+                    continue
+            try:
+                # a flight for this key may have finished right before ours began
+                # (checked with `in` so the miss is not counted twice in the cache stats)
+                result = self.outputs.get(key) if key in self.outputs else None
+                if result is None:
+                    text, stats = await self._astream(statement, remaining)
+                    result = parse_output(text)
+                    self.outputs.put(key, result)
+                    result = replace(result, stats=stats)
+                flight.finish(result)
+                return result
+            except BaseException as error:
+                flight.fail(error)
+                raise
+            finally:
+                self._flights.end(key, flight)
+    # formalizes many independent statements concurrently, at most max_concurrency at a time
+    # results (LogicResults) come back in input order; cached statements never reach the model
+    # with return_exceptions=True a failed, malformed or timed out statement yields its exception
+    # in place, otherwise the first failure cancels the remaining requests and is raised
+    async def aprocess_many(self, statements: list, max_concurrency: int = 4,
+                            timeout: float = None, return_exceptions: bool = False) -> list:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(statement):
+            async with semaphore:
+                return await self.aget_result(statement, timeout=timeout)
+
+        tasks = [asyncio.ensure_future(run(statement)) for statement in statements]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        finally:
+            for task in tasks:
+                task.cancel()
+    # cache key for a statement: everything that influences the llm output
+    # (stop sequences can cut the output, so they are part of the key when set)
+    # a pool mixing models gives different outputs, so its entries are not shared with any single model
+    def cache_key(self, statement: str) -> str:
+        model_name = self.model_name
+        if self.router is not None and self.router.models != [model_name]:
+            model_name = ",".join(self.router.models)
+        return ResponseCache.make_key(
+            model_name, self.model_provider, self.temperature, self.system_prompt, statement,
+            LogicResult.FORMAT, *([self.stop] if self.stop else [])
+        )
+    # returns the parsed llm output, asking the model only on a cache miss
+    # raises MalformedOutputError (and caches nothing) if the output has the wrong format
+    # a fresh result carries the StreamStats of its llm call, a cached one has stats None
+    # callers asking for a statement that is being generated right now (other thread or
+    # event loop) do not start another generation: their sink is fed the same chunks and
+    # they get the same result (or exception); if that generation is abandoned they retry
+    # on_definition is called for each definition while the output streams in (only when
+    # this call generates it, not for cache hits or coalesced calls)
+    def get_result(self, statement: str, on_definition=None) -> LogicResult:
+        key = self.cache_key(statement)
+        while True:
+            result = self.outputs.get(key)
+            if result is not None:
+                return result
+            flight, leader = self._flights.begin(key)
+            if not leader:
+                metrics.registry.increment("singleflight.coalesced")
+                try:
+                    for chunk in flight.follow():
+                        self.sink.write(chunk)
+                    self.sink.flush()
+                    return flight.result()
+                except Abandoned:
+                    continue
+            try:
+                # a flight for this key may have finished right before ours began
+                # (checked with `in` so the miss is not counted twice in the cache stats)
+                result = self.outputs.get(key) if key in self.outputs else None
+                if result is None:
+                    # the stats stay local: last_stats may be overwritten by a concurrent call
+                    text, stats = self.generate(statement, flight.publish, on_definition)
+                    result = parse_output(text)
+                    # the cache keeps the result without stats, a later hit made no llm call
+                    self.outputs.put(key, result)
+                    result = replace(result, stats=stats)
+                flight.finish(result)
+                return result
+            except BaseException as error:
+                flight.fail(error)
+                raise
+            finally:
+                self._flights.end(key, flight)
+    # returns only the logic form expression
+    def get_expression(self, statement: str) -> str:
+        return self.get_result(statement).expression
+    # returns only the definitions, as a dict of atom name -> description
+    def get_definitions(self, statement: str) -> dict:
+        return self.get_result(statement).definitions
@@ -0,0 +1,60 @@
+from modules import metrics
+from modules.definition_index import estimate_tokens
+
+
+class PromptAssembler:
+    """
+    Renders the user message of a turn so that consecutive prompts share the
+    longest possible prefix, which lets the model server reuse its KV cache
+    instead of re-evaluating the whole context.
+    The full prompt is laid out as
+        system prompt (static) | known definitions (append-only) | statement (new)
+    - Definitions selected for a turn are appended after the ones already
+      shown, in a stable order; earlier lines are never reordered or rewritten.
+    - When the block would grow past token_budget it is rebased onto just the
+      current selection. That turn misses the cache once; later turns build on
+      the new block again.
+    One assembler belongs to one conversation.
+    """
+
+    HEADER = "Known definitions:\n"
+    STATEMENT_HEADER = "\nStatement:\n"
+
+    def __init__(self, token_budget: int = 2048, k: int = 20, select_budget: int = 512):
+        self.token_budget = token_budget
+        self.k = k
+        self.select_budget = select_budget
+        self.rebases = 0
+        self._names = set()
+        self._lines = []
+        self._tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    # the user message for a statement, with the relevant definitions of db in front of it
+    def render(self, statement: str, db) -> str:
+        relevant = db.get_relevant_records(statement, k=self.k, token_budget=self.select_budget)
+        new = [(name, description) for name, description in relevant.items() if name not in self._names]
+        cost = sum(estimate_tokens(f"{name}: {description}\n") for name, description in new)
+        if new and self._tokens + cost > self.token_budget:
+            self.reset()
+            self.rebases += 1
+            metrics.registry.increment("prompt.rebases")
+            new = list(relevant.items())
+        for name, description in new:
+            self._append(name, description)
+        metrics.registry.observe("prompt.context_tokens", self._tokens, scale=1)
+        return self.HEADER + "".join(self._lines) + self.STATEMENT_HEADER + statement
+
+    # forgets the context block (e.g. at the start of a new conversation)
+    def reset(self):
+        self._names.clear()
+        self._lines = []
+        self._tokens = 0
+
+    def _append(self, name: str, description: str):
+        line = f"{name}: {description}\n"
+        self._names.add(name)
+        self._lines.append(line)
+        self._tokens += estimate_tokens(line)
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+    - Hot tier: an in-memory LRU dict holding the most recent entries.
+    - Cold tier: an SQLite file on disk, bounded by total size with LRU eviction.
+    Keys are content hashes built with ResponseCache.make_key().
+    Values are kept as objects in memory; encode/decode turn them into
+    text for the disk tier (identity by default).
+    Hits in the hot tier refresh the disk LRU position too, in batches of
+    touch_batch (and before every eviction), so the most used entries are
+    not the first ones evicted from disk.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = 64 * 1024 * 1024,
+                 memory_items: int = 256, encode=None, decode=None, touch_batch: int = 64):
+        # path=None keeps the cache in memory only (nothing survives a restart)
+        self.path = path
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda text: text)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+
+        self._hot = OrderedDict()
+        self._touched = {}      # key -> last access of hot-tier hits not yet written to disk
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_total = 0
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)"
+            )
+            self._db.commit()
+            self._disk_total = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    # builds the content address of a response
+    # every input that changes the model output must be part of the key
+    @staticmethod
+    def make_key(*parts) -> str:
+        payload = json.dumps([str(part) for part in parts], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # returns the cached value or None, refreshing its LRU position
+    def get(self, key: str):
+        with self._lock:
+            if key in self._hot:
+                self._hot.move_to_end(key)
+                self.hits += 1
+                if self._db is not None:
+                    self._touched[key] = time.time()
+                    if len(self._touched) >= self.touch_batch:
+                        self._write_touched()
+                        self._db.commit()
+                return self._hot[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE responses SET last_access = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self._db.commit()
+                    value = self.decode(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    # stores a value in both tiers and evicts old entries if needed
+    def put(self, key: str, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            text = self.encode(value)
+            size = len(text.encode("utf-8"))
+            old = self._db.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()),
+            )
+            self._disk_total += size - (old[0] if old else 0)
+            self._touched.pop(key, None)
+            self._evict()
+            self._db.commit()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._hot:
+                return True
+            if self._db is None:
+                return False
+            row = self._db.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is None:
+                return len(self._hot)
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    # hit/miss counters plus current sizes
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_items": len(self._hot),
+            "disk_bytes": self._disk_total,
+        }
+
+    # writes the pending last_access updates of hot-tier hits to disk
+    def flush(self):
+        with self._lock:
+            if self._db is not None and self._touched:
+                self._write_touched()
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+                self._disk_total = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._write_touched()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    # --- internals (caller holds self._lock) ---
+
+    def _remember(self, key, value):
+        self._hot[key] = value
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.memory_items:
+            self._hot.popitem(last=False)
+
+    def _write_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        excess = self._disk_total - self.max_bytes
+        if excess <= 0:
+            return
+        # the LRU order must include the hot-tier hits
+        self._write_touched()
+        # walk the oldest entries until enough bytes are freed
+        doomed = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ):
+            doomed.append((key,))
+            excess -= size
+            self._disk_total -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
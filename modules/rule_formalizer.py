@@ -0,0 +1,236 @@
+import re
+import time
+
+from modules import metrics
+from modules.definition_parser import ATOM_NAME
+from modules.logic_ast import LogicSyntaxError, parse
+from modules.logic_result import LogicResult
+
+# words a clause may start with; leading ones are dropped from atom names
+SUBJECTS = frozenset("i you he she it we they there the a an this that these those my your his her our their".split())
+# dropped leading words that do not name who the clause is about
+_NOT_SUBJECTS = frozenset("it there the a an".split())
+# words that make a clause too complex to formalize by rule
+_BLOCKED = frozenset(
+    "and or if then but because unless when whenever while although though so since until "
+    "all every each some any none no never nobody nothing always only either neither nor both "
+    "should must might may could would maybe probably whether".split()
+)
+# verbs (and adjectives) taking a clause: "I wonder if it rains" is not "Rains IMPLY Wonder"
+_CLAUSE_TAKERS = frozenset(
+    "wonder wonders wondered wondering know knows knew knowing ask asks asked asking "
+    "check checks checked checking see sees saw seeing tell tells told telling decide decides "
+    "decided deciding doubt doubts doubted doubting test tests tested testing sure unsure certain".split()
+)
+# auxiliaries and modals between the subject and the main verb ("you can have ...")
+_VERB_AUXILIARIES = frozenset("can will shall do does did am is are was were".split())
+_NEGATIONS = frozenset(("not",))
+# contractions and the missing-apostrophe forms people type (dont, doesnt, ...)
+_CONTRACTIONS = {
+    "don't": "do", "dont": "do", "doesn't": "does", "doesnt": "does", "didn't": "did", "didnt": "did",
+    "isn't": "is", "isnt": "is", "aren't": "are", "arent": "are", "wasn't": "was", "wasnt": "was",
+    "weren't": "were", "werent": "were", "can't": "can", "cant": "can", "cannot": "can",
+    "won't": "will", "wont": "will",
+}
+_AUXILIARIES = frozenset(("do", "does", "did"))
+_WORD = re.compile(r"^[A-Za-z][A-Za-z'-]*$")
+
+# sentence templates, tried in order on the sentence without its final period
+_TEMPLATES = [
+    ("iff", re.compile(r"^(?P<a>.+?),? if and only if (?P<b>.+)$", re.IGNORECASE)),
+    ("imply", re.compile(r"^if (?P<a>.+?),? then (?P<b>.+)$", re.IGNORECASE)),
+    ("imply", re.compile(r"^if (?P<a>[^,]+), (?P<b>.+)$", re.IGNORECASE)),
+    ("implied_by", re.compile(r"^(?P<b>.+?),? if (?P<a>.+)$", re.IGNORECASE)),
+    ("xor", re.compile(r"^(?:either )?(?P<a>.+?),? or (?P<b>.+?),? but not both$", re.IGNORECASE)),
+    ("junction", re.compile(r"^(?P<a>.+)$", re.IGNORECASE)),
+]
+
+
+class Clause:
+    """One simple clause: the atom it stands for, its description and whether it is negated."""
+
+    def __init__(self, name: str, description: str, negated: bool, subject: tuple = ()):
+        self.name = name
+        self.description = description
+        self.negated = negated
+        # the dropped pronouns the clause is about ("you", "my"); () for it / there / articles
+        self.subject = subject
+
+    def __str__(self) -> str:
+        return f"(NOT {self.name})" if self.negated else self.name
+
+
+# a clause like "the street is not wet" -> Clause("Street_Is_Wet", "The street is wet", negated=True)
+# None when the text is not a single simple clause
+def parse_clause(text: str):
+    words = text.strip().split()
+    if not 2 <= len(words) <= 10 or any(not _WORD.match(word) for word in words):
+        return None
+    if words[0].lower() not in SUBJECTS:
+        return None
+
+    negated = False
+    kept = []
+    for word in words:
+        lower = word.lower()
+        if lower in _BLOCKED:
+            return None
+        if lower in _NEGATIONS or lower in _CONTRACTIONS:
+            if negated:
+                return None
+            negated = True
+            if lower in _CONTRACTIONS:
+                kept.append(_CONTRACTIONS[lower])
+            continue
+        kept.append(word)
+    # "I do not eat cake" -> "I eat cake"
+    if negated and len(kept) > 2 and kept[1].lower() in _AUXILIARIES:
+        kept.pop(1)
+
+    content = list(kept)
+    subject = []
+    while content and content[0].lower() in SUBJECTS:
+        word = content.pop(0).lower()
+        if word not in _NOT_SUBJECTS:
+            subject.append(word)
+    if not content:
+        return None
+    name = "_".join(word.replace("'", "").replace("-", "_").capitalize() for word in content)
+    if not ATOM_NAME.match(name):
+        return None
+    description = " ".join(kept)
+    description = description[0].upper() + description[1:]
+    return Clause(name, description, negated, tuple(subject))
+
+
+# the second alternative of "<a> or <b>" with the words it shares with the first put back:
+# "you can have cake" + "ice cream" -> "you can have ice cream", "it rains" + "snows" -> "it snows"
+# None when b is not such an ellipsis
+def complete_alternative(a: str, b: str):
+    words, rest = a.split(), b.split()
+    if not rest or rest[0].lower() in SUBJECTS:
+        return None
+    verb = 0
+    while verb < len(words) and (words[verb].lower() in SUBJECTS or words[verb].lower() in _VERB_AUXILIARIES):
+        verb += 1
+    if verb == 0 or verb >= len(words):
+        return None
+    # "<subject> <verb> <object>": b replaces the object, "<subject> <verb>": b replaces the verb
+    shared = words[:verb + 1] if verb + 1 < len(words) else words[:verb]
+    return " ".join(shared + rest)
+
+
+# a clause or a plain AND / OR of clauses; returns (expression, clauses, is_compound) or None
+def parse_junction(text: str):
+    for connective in ("and", "or"):
+        parts = re.split(rf",?\s+{connective}\s+", text, flags=re.IGNORECASE)
+        if len(parts) > 1:
+            parts[0] = re.sub(r"^either\s+", "", parts[0], flags=re.IGNORECASE)
+            clauses = [parse_clause(part) for part in parts]
+            if any(clause is None for clause in clauses):
+                return None
+            return f" {connective.upper()} ".join(map(str, clauses)), clauses, True
+    clause = parse_clause(text)
+    if clause is None:
+        return None
+    return str(clause), [clause], False
+
+
+class RuleFormalizer:
+    """
+    Deterministic fast path for trivially shaped statements, following the
+    turn_into_logic examples:
+    - "If A, (then) B." / "B if A."          -> A IMPLY B
+    - "A if and only if B."                   -> (A IMPLY B) AND (B IMPLY A)
+    - "A or B, but not both."                 -> (A OR B) AND (NOT (A AND B))
+    - "A and B." / "(Either) A or B."         -> A AND B / A OR B
+    - negation ("not", "don't", ...)          -> NOT A
+    A clause must start with a pronoun or article and contain no other
+    connectives, quantifiers or modal verbs; anything else returns None and is
+    left to the llm. Atom names drop the leading pronouns/articles and join the
+    capitalized words ("the street is wet" -> Street_Is_Wet), so clauses about
+    different people ("If you eat cake, I eat cake.") and embedded questions
+    ("I wonder if it rains.") are left to the llm as well. The second
+    alternative of "A or B, but not both" may leave out the words it shares
+    with the first ("You can have cake or ice cream, but not both.").
+    Hits, misses and latency are reported to metrics.registry (fastpath.*).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # a LogicResult for the statement, or None when no template matches confidently
+    def formalize(self, statement: str):
+        start = time.perf_counter()
+        result = self._formalize(statement)
+        if result is None:
+            self.misses += 1
+            metrics.registry.increment("fastpath.misses")
+        else:
+            self.hits += 1
+            metrics.registry.increment("fastpath.hits")
+        metrics.registry.observe("fastpath.seconds", time.perf_counter() - start, scale=1e9)
+        return result
+
+    def _formalize(self, statement: str):
+        sentence = " ".join(statement.split()).rstrip(".!").strip()
+        # one sentence only, no questions, quotes or other punctuation
+        if not sentence or re.search(r"[.?!;:\"()\[\]]", sentence):
+            return None
+
+        for kind, template in _TEMPLATES:
+            match = template.match(sentence)
+            if match is None:
+                continue
+            parsed = self._build(kind, match.groupdict())
+            if parsed is None:
+                continue
+            expression, clauses = parsed
+            # without their subjects "If you eat cake, I eat cake." would become Eat_Cake IMPLY Eat_Cake
+            if len({clause.subject for clause in clauses if clause.subject}) > 1:
+                return None
+            try:
+                parse(expression)
+            except LogicSyntaxError:
+                return None
+            definitions = {}
+            for clause in clauses:
+                definitions.setdefault(clause.name, clause.description)
+            return LogicResult(definitions, expression)
+        return None
+
+    @staticmethod
+    def _build(kind, groups):
+        if kind == "junction":
+            parsed = parse_junction(groups["a"])
+            if parsed is None:
+                return None
+            expression, clauses, _ = parsed
+            if len(clauses) == 1 and clauses[0].negated:
+                expression = f"NOT {clauses[0].name}"
+            return expression, clauses
+        if kind == "xor":
+            a, b = parse_clause(groups["a"]), parse_clause(groups["b"])
+            if a is not None and b is None and not a.negated:
+                completed = complete_alternative(groups["a"], groups["b"])
+                b = parse_clause(completed) if completed is not None else None
+            if a is None or b is None or a.name == b.name:
+                return None
+            return f"({a} OR {b}) AND (NOT ({a} AND {b}))", [a, b]
+        if kind == "implied_by" and groups["b"].split()[-1].lower() in _CLAUSE_TAKERS:
+            return None
+
+        a, b = parse_junction(groups["a"]), parse_junction(groups["b"])
+        if a is None or b is None:
+            return None
+        left = f"({a[0]})" if a[2] else a[0]
+        right = f"({b[0]})" if b[2] else b[0]
+        if kind == "iff":
+            return f"({left} IMPLY {right}) AND ({right} IMPLY {left})", a[1] + b[1]
+        return f"{left} IMPLY {right}", a[1] + b[1]
@@ -0,0 +1,326 @@
+import heapq
+
+
+# luby restart sequence: 1 1 2 1 1 2 4 1 1 2 ...
+def luby(index: int) -> int:
+    size, sequence = 1, 0
+    while size < index + 1:
+        sequence += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        sequence -= 1
+        index %= size
+    return 1 << sequence
+
+
+class Solver:
+    """
+    CDCL SAT solver.
+    - Literals are DIMACS style ints: v is variable v, -v is its negation.
+    - Two watched literals per clause, first-UIP clause learning,
+      VSIDS decision heuristic with phase saving and Luby restarts.
+    - solve() accepts assumptions, i.e. literals that must hold for this call only.
+    - Incremental: clauses can be added between solve() calls and learned clauses
+      are kept, so later calls reuse the work of earlier ones. When there are more
+      than max_learnts learned clauses, the longer half is dropped.
+    """
+
+    RESTART_BASE = 100
+    VAR_DECAY = 0.95
+
+    def __init__(self, max_learnts: int = 20000):
+        self.max_learnts = max_learnts
+        self.num_vars = 0
+        self.ok = True            # False once the clauses are unsatisfiable at level 0
+        self.clauses = []         # original clauses
+        self.learnts = []         # learned clauses
+        self.conflicts = 0
+
+        # per internal literal (2 * var + sign), index 0/1 unused
+        self._values = [0, 0]     # 1 true, -1 false, 0 unassigned
+        self._watches = [[], []]
+        # per variable
+        self._level = [0]
+        self._reason = [None]
+        self._activity = [0.0]
+        self._polarity = [1]      # saved phase, 1 means "try false first"
+        self._trail = []
+        self._trail_lim = []
+        self._qhead = 0
+        self._heap = []
+        self._var_inc = 1.0
+        self._model = None
+
+    # creates a fresh variable and returns its number
+    def new_var(self) -> int:
+        self.num_vars += 1
+        self._values.extend((0, 0))
+        self._watches.extend(([], []))
+        self._level.append(0)
+        self._reason.append(None)
+        self._activity.append(0.0)
+        self._polarity.append(1)
+        heapq.heappush(self._heap, (0.0, self.num_vars))
+        return self.num_vars
+
+    # adds a clause (iterable of DIMACS literals); returns False if the solver became unsat
+    def add_clause(self, literals) -> bool:
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+
+        clause = []
+        seen = set()
+        for literal in literals:
+            while abs(literal) > self.num_vars:
+                self.new_var()
+            lit = self._internal(literal)
+            if lit ^ 1 in seen or self._values[lit] == 1:
+                return True           # tautology or already satisfied
+            if lit in seen or self._values[lit] == -1:
+                continue              # duplicate or false at level 0
+            seen.add(lit)
+            clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self.clauses.append(clause)
+            self._attach(clause)
+        return self.ok
+
+    # searches for a model; returns True (sat) or False (unsat under the assumptions)
+    def solve(self, assumptions=()) -> bool:
+        self._model = None
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+
+        if len(self.learnts) > self.max_learnts:
+            self._reduce_learnts()
+
+        assumed = []
+        for literal in assumptions:
+            while abs(literal) > self.num_vars:
+                self.new_var()
+            assumed.append(self._internal(literal))
+
+        restarts = 0
+        while True:
+            budget = luby(restarts) * self.RESTART_BASE
+            status = self._search(budget, assumed)
+            if status is not None:
+                self._cancel_until(0)
+                return status
+            restarts += 1
+
+    # the last model as {var: bool}, or None when the last solve() was not sat
+    def model(self) -> dict:
+        return self._model
+
+    # --- internals ---
+
+    @staticmethod
+    def _internal(literal: int) -> int:
+        return 2 * literal if literal > 0 else 2 * -literal + 1
+
+    def _attach(self, clause):
+        self._watches[clause[0]].append(clause)
+        self._watches[clause[1]].append(clause)
+
+    # drops the longer half of the learned clauses (called at level 0, where no
+    # learned clause is needed as a reason for conflict analysis)
+    def _reduce_learnts(self):
+        self.learnts.sort(key=len)
+        keep = self.max_learnts // 2
+        doomed = self.learnts[keep:]
+        del self.learnts[keep:]
+        dropped = {id(clause) for clause in doomed}
+        touched = {lit for clause in doomed for lit in clause[:2]}
+        for lit in touched:
+            self._watches[lit] = [c for c in self._watches[lit] if id(c) not in dropped]
+        for var in range(1, self.num_vars + 1):
+            if self._reason[var] is not None and id(self._reason[var]) in dropped:
+                self._reason[var] = None
+
+    def _enqueue(self, lit, reason):
+        var = lit >> 1
+        self._values[lit] = 1
+        self._values[lit ^ 1] = -1
+        self._level[var] = len(self._trail_lim)
+        self._reason[var] = reason
+        self._trail.append(lit)
+
+    def _decision_level(self):
+        return len(self._trail_lim)
+
+    def _new_decision_level(self):
+        self._trail_lim.append(len(self._trail))
+
+    def _cancel_until(self, level):
+        if len(self._trail_lim) <= level:
+            return
+        values, polarity, activity, heap = self._values, self._polarity, self._activity, self._heap
+        stop = self._trail_lim[level]
+        for index in range(len(self._trail) - 1, stop - 1, -1):
+            lit = self._trail[index]
+            var = lit >> 1
+            values[lit] = 0
+            values[lit ^ 1] = 0
+            self._reason[var] = None
+            polarity[var] = lit & 1
+            heapq.heappush(heap, (-activity[var], var))
+        del self._trail[stop:]
+        del self._trail_lim[level:]
+        self._qhead = stop
+
+    # unit propagation over the watch lists; returns a conflicting clause or None
+    def _propagate(self):
+        values, watches, trail = self._values, self._watches, self._trail
+        while self._qhead < len(trail):
+            false_lit = trail[self._qhead] ^ 1
+            self._qhead += 1
+            watchers = watches[false_lit]
+            kept = []
+            index = 0
+            count = len(watchers)
+            while index < count:
+                clause = watchers[index]
+                index += 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if values[first] == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    candidate = clause[k]
+                    if values[candidate] != -1:
+                        clause[1], clause[k] = candidate, false_lit
+                        watches[candidate].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[first] == -1:
+                        kept.extend(watchers[index:])
+                        watches[false_lit] = kept
+                        return clause
+                    self._enqueue(first, clause)
+            watches[false_lit] = kept
+        return None
+
+    def _bump(self, var):
+        activity = self._activity
+        activity[var] += self._var_inc
+        if activity[var] > 1e100:
+            for v in range(1, self.num_vars + 1):
+                activity[v] *= 1e-100
+            self._var_inc *= 1e-100
+            self._heap = [(-activity[v], v) for v in range(1, self.num_vars + 1)
+                          if self._values[2 * v] == 0]
+            heapq.heapify(self._heap)
+        elif self._values[2 * var] == 0:
+            heapq.heappush(self._heap, (-activity[var], var))
+
+    # first-UIP conflict analysis; returns (learned clause, backjump level)
+    def _analyze(self, conflict):
+        seen = set()
+        learnt = [0]
+        counter = 0
+        lit = None
+        clause = conflict
+        index = len(self._trail) - 1
+        level = self._decision_level()
+        while True:
+            start = 0 if lit is None else 1
+            for k in range(start, len(clause)):
+                q = clause[k]
+                var = q >> 1
+                if var not in seen and self._level[var] > 0:
+                    seen.add(var)
+                    self._bump(var)
+                    if self._level[var] >= level:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while (self._trail[index] >> 1) not in seen:
+                index -= 1
+            lit = self._trail[index]
+            index -= 1
+            clause = self._reason[lit >> 1]
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = lit ^ 1
+        self._var_inc /= self.VAR_DECAY
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # the literal with the highest level goes to the second watch position
+        best = max(range(1, len(learnt)), key=lambda k: self._level[learnt[k] >> 1])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self._level[learnt[1] >> 1]
+
+    def _pick_branch(self):
+        heap, values, activity = self._heap, self._values, self._activity
+        while heap:
+            score, var = heapq.heappop(heap)
+            if values[2 * var] == 0 and -score == activity[var]:
+                return 2 * var + self._polarity[var]
+        # stale heap entries only: fall back to a scan
+        for var in range(1, self.num_vars + 1):
+            if values[2 * var] == 0:
+                return 2 * var + self._polarity[var]
+        return None
+
+    # runs CDCL until sat/unsat (True/False) or the conflict budget is spent (None)
+    def _search(self, budget, assumptions):
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                conflicts += 1
+                self.conflicts += 1
+                if self._decision_level() == 0:
+                    self.ok = False
+                    return False
+                learnt, back_level = self._analyze(conflict)
+                self._cancel_until(back_level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self.learnts.append(learnt)
+                    self._attach(learnt)
+                    self._enqueue(learnt[0], learnt)
+                continue
+
+            if conflicts >= budget:
+                self._cancel_until(0)
+                return None
+
+            # assumptions occupy the first decision levels
+            lit = None
+            while self._decision_level() < len(assumptions):
+                assumed = assumptions[self._decision_level()]
+                if self._values[assumed] == 1:
+                    self._new_decision_level()
+                elif self._values[assumed] == -1:
+                    return False
+                else:
+                    lit = assumed
+                    break
+            if lit is None:
+                lit = self._pick_branch()
+                if lit is None:
+                    self._model = {var: self._values[2 * var] == 1
+                                   for var in range(1, self.num_vars + 1)}
+                    return True
+            self._new_decision_level()
+            self._enqueue(lit, None)
@@ -0,0 +1,75 @@
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import metrics
+from modules.logic_result import LogicResult
+
+# a sentence ends at . ! or ? followed by whitespace and an upper case letter (or a quote)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'A-Z])")
+
+
+def split_sentences(text: str) -> list:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text.strip()) if sentence.strip()]
+
+
+# joins per-sentence results: expressions with AND, definitions merged (first one wins)
+def combine(results) -> LogicResult:
+    results = list(results)
+    if len(results) == 1:
+        return results[0]
+    definitions = {}
+    for result in results:
+        for name, description in result.definitions.items():
+            definitions.setdefault(name, description)
+    expression = " AND ".join(f"({result.expression})" for result in results)
+    return LogicResult(definitions, expression)
+
+
+class SentenceDecomposer:
+    """
+    Formalizes a paragraph sentence by sentence.
+    - Each sentence is tried on the rule formalizer first (if given), the rest
+      go to the model concurrently, at most max_concurrency at a time.
+    - Sentences are sent without knowledge base context, so the response cache
+      key is the sentence alone: a sentence that recurs in later turns (or for
+      other users) is a cache hit. Atom names are unified afterwards by the
+      canonicalizer, as for whole-paragraph results.
+    - The results are joined with AND and their definitions merged.
+    """
+
+    def __init__(self, model_interface, formalizer=None, max_concurrency: int = 4, timeout: float = None):
+        self.model_interface = model_interface
+        self.formalizer = formalizer
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    # blocking version of aformalize; async callers should await aformalize instead
+    # called from inside a running event loop (which cannot be re-entered) the batch
+    # runs on its own loop in a worker thread
+    def formalize(self, text: str) -> LogicResult:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aformalize(text))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.aformalize(text)).result()
+
+    async def aformalize(self, text: str) -> LogicResult:
+        sentences = split_sentences(text)
+        if not sentences:
+            raise ValueError("nothing to formalize")
+        metrics.registry.observe("decompose.sentences", len(sentences), scale=1)
+
+        results = [None] * len(sentences)
+        if self.formalizer is not None:
+            for index, sentence in enumerate(sentences):
+                results[index] = self.formalizer.formalize(sentence)
+        pending = [index for index, result in enumerate(results) if result is None]
+        answers = await self.model_interface.aprocess_many(
+            [sentences[index] for index in pending],
+            max_concurrency=self.max_concurrency, timeout=self.timeout
+        )
+        for index, answer in zip(pending, answers):
+            results[index] = answer
+        return combine(results)
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+
+
+class Abandoned(Exception):
+    """
+    The leader of a flight stopped without a result (it was cancelled or ran
+    out of its own timeout); followers should retry under their own deadline.
+    """
+
+
+# leader errors that say nothing about the generation itself, only about that caller
+# (a timeout is the leader's own deadline; a follower may have a longer one)
+_ABANDONING = (asyncio.CancelledError, asyncio.TimeoutError, TimeoutError, KeyboardInterrupt, GeneratorExit)
+
+
+class Flight:
+    """
+    One in-flight generation shared by every caller with the same key.
+    The leader publishes chunks and then finishes (or fails); followers replay
+    the chunks published so far, wait for the rest and receive the same
+    result or exception. Works across threads and event loops.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.followers = 0
+        self._result = None
+        self._error = None
+        self._cond = threading.Condition()
+        self._async_waiters = []
+
+    # --- leader ---
+
+    def publish(self, chunk: str):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._wake()
+
+    def finish(self, result):
+        with self._cond:
+            self._result = result
+            self.done = True
+            self._wake()
+
+    def fail(self, error: BaseException):
+        with self._cond:
+            self._error = error
+            self.done = True
+            self._wake()
+
+    # --- followers ---
+
+    # yields every chunk of the generation, blocking until it is complete
+    def follow(self):
+        index = 0
+        while True:
+            with self._cond:
+                while index == len(self.chunks) and not self.done:
+                    self._cond.wait()
+                chunks = self.chunks[index:]
+                done = self.done
+            index += len(chunks)
+            yield from chunks
+            if done and index == len(self.chunks):
+                return
+
+    # async version of follow
+    async def afollow(self):
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            future = None
+            with self._cond:
+                chunks = self.chunks[index:]
+                done = self.done
+                if not chunks and not done:
+                    future = loop.create_future()
+                    self._async_waiters.append((loop, future))
+            if future is not None:
+                await future
+                continue
+            index += len(chunks)
+            for chunk in chunks:
+                yield chunk
+            if done and index == len(self.chunks):
+                return
+
+    # the leader's result once the flight is done; raises the leader's exception
+    def result(self):
+        with self._cond:
+            while not self.done:
+                self._cond.wait()
+        return self._outcome()
+
+    async def aresult(self):
+        async for _ in self.afollow():
+            pass
+        return self._outcome()
+
+    def _outcome(self):
+        if self._error is not None:
+            if isinstance(self._error, _ABANDONING):
+                raise Abandoned() from self._error
+            raise self._error
+        return self._result
+
+    def _wake(self):
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+
+class SingleFlight:
+    """
+    Table of in-flight generations by key:
+        flight, leader = flights.begin(key)
+    The first caller for a key becomes the leader and must call end(key, flight)
+    when it is done; callers arriving meanwhile get the same flight as followers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def begin(self, key: str) -> tuple:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def end(self, key: str, flight: Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
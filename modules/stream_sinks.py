@@ -0,0 +1,82 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from modules.logger import Logger
+
+
+class StreamSink(ABC):
+    """
+    Receives the streamed llm output chunk by chunk.
+    write() is called for every chunk, flush() once the response is complete.
+    """
+
+    @abstractmethod
+    def write(self, chunk: str):
+        pass
+
+    def flush(self):
+        pass
+
+
+class ConsoleSink(StreamSink):
+    """Prints every chunk in green as soon as it arrives (live output)."""
+
+    def write(self, chunk: str):
+        Logger.log(chunk, end="")
+
+
+class CoalescingSink(StreamSink):
+    """
+    Prints in green, but collects chunks and writes them together once
+    interval_ms have passed since the last write or max_bytes are pending.
+    Fewer, larger writes to the console for the same visible output.
+    """
+
+    def __init__(self, interval_ms: float = 50, max_bytes: int = 256):
+        self.interval = interval_ms / 1000.0
+        self.max_bytes = max_bytes
+        self._pending = []
+        self._size = 0
+        self._last = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def write(self, chunk: str):
+        with self._lock:
+            self._pending.append(chunk)
+            self._size += len(chunk)
+            now = time.perf_counter()
+            if self._size >= self.max_bytes or now - self._last >= self.interval:
+                self._emit(now)
+
+    def flush(self):
+        with self._lock:
+            self._emit(time.perf_counter())
+
+    def _emit(self, now):
+        if self._pending:
+            Logger.log("".join(self._pending), end="")
+            self._pending = []
+            self._size = 0
+        self._last = now
+
+
+class NullSink(StreamSink):
+    """Discards the stream; for headless runs where nobody watches the output."""
+
+    def write(self, chunk: str):
+        pass
+
+
+class CallbackSink(StreamSink):
+    """Hands every chunk to a callable, e.g. to forward tokens to a client."""
+
+    def __init__(self, callback, on_flush=None):
+        self.callback = callback
+        self.on_flush = on_flush
+
+    def write(self, chunk: str):
+        self.callback(chunk)
+
+    def flush(self):
+        if self.on_flush is not None:
+            self.on_flush()
@@ -0,0 +1,134 @@
+import time
+from dataclasses import dataclass, field
+
+from modules import metrics
+from modules.definition_index import estimate_tokens
+
+
+@dataclass(frozen=True)
+class StreamStats:
+    """
+    Timings of one streamed llm response.
+    - time_to_first_chunk: seconds from sending the request to the first chunk,
+      dominated by prompt evaluation (grows with the prompt)
+    - generation_time: seconds from the first to the last chunk (decoding)
+    - chunk_gaps: seconds between consecutive chunks
+    - output_tokens: the chunk count; ollama streams one token per chunk
+    - prompt_chars / prompt_tokens: size of the full prompt (system + statement),
+      prompt_tokens is an estimate (~4 characters per token)
+    - stopped_early: the stream was cut once the expression was complete
+    """
+    prompt_chars: int = 0
+    prompt_tokens: int = 0
+    statement_chars: int = 0
+    time_to_first_chunk: float = 0.0
+    total_time: float = 0.0
+    chunks: int = 0
+    output_chars: int = 0
+    output_tokens: int = 0
+    chunk_gaps: tuple = field(default=(), repr=False)
+    stopped_early: bool = False
+
+    @property
+    def generation_time(self) -> float:
+        return max(0.0, self.total_time - self.time_to_first_chunk)
+
+    # output tokens per second of decoding (time to first chunk excluded)
+    @property
+    def tokens_per_second(self) -> float:
+        if self.output_tokens <= 1 or self.generation_time <= 0:
+            return 0.0
+        return (self.output_tokens - 1) / self.generation_time
+
+    @property
+    def max_chunk_gap(self) -> float:
+        return max(self.chunk_gaps, default=0.0)
+
+    @property
+    def mean_chunk_gap(self) -> float:
+        return sum(self.chunk_gaps) / len(self.chunk_gaps) if self.chunk_gaps else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "prompt_chars": self.prompt_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "statement_chars": self.statement_chars,
+            "time_to_first_chunk": self.time_to_first_chunk,
+            "generation_time": self.generation_time,
+            "total_time": self.total_time,
+            "chunks": self.chunks,
+            "output_chars": self.output_chars,
+            "output_tokens": self.output_tokens,
+            "tokens_per_second": self.tokens_per_second,
+            "mean_chunk_gap": self.mean_chunk_gap,
+            "max_chunk_gap": self.max_chunk_gap,
+            "stopped_early": self.stopped_early,
+        }
+
+
+class StreamMeter:
+    """
+    Measures a stream while it is consumed:
+        meter = StreamMeter(prompt, statement)
+        for chunk in stream:
+            meter.chunk(chunk)
+        stats = meter.finish()
+    finish() also reports the numbers to metrics.registry (observations named llm.*).
+    """
+
+    def __init__(self, prompt: str, statement: str = ""):
+        self.prompt_chars = len(prompt)
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.statement_chars = len(statement)
+        self.start = time.perf_counter()
+        self.first = None
+        self.last = None
+        self.gaps = []
+        self.chunks = 0
+        self.output_chars = 0
+
+    def chunk(self, text: str):
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now
+        else:
+            self.gaps.append(now - self.last)
+        self.last = now
+        self.chunks += 1
+        self.output_chars += len(text)
+
+    def finish(self, stopped_early: bool = False) -> StreamStats:
+        end = time.perf_counter()
+        stats = StreamStats(
+            prompt_chars=self.prompt_chars,
+            prompt_tokens=self.prompt_tokens,
+            statement_chars=self.statement_chars,
+            time_to_first_chunk=(self.first if self.first is not None else end) - self.start,
+            total_time=end - self.start,
+            chunks=self.chunks,
+            output_chars=self.output_chars,
+            output_tokens=self.chunks,
+            chunk_gaps=tuple(self.gaps),
+            stopped_early=stopped_early,
+        )
+        report(stats)
+        return stats
+
+
+# records one response in the metrics registry
+def report(stats: StreamStats):
+    registry = metrics.registry
+    if not registry.enabled:
+        return
+    registry.increment("llm.responses")
+    registry.increment("llm.output_tokens", stats.output_tokens)
+    registry.increment("llm.prompt_tokens", stats.prompt_tokens)
+    if stats.stopped_early:
+        registry.increment("llm.early_stops")
+    registry.observe("llm.time_to_first_chunk_seconds", stats.time_to_first_chunk, scale=1e6)
+    registry.observe("llm.generation_seconds", stats.generation_time, scale=1e6)
+    registry.observe("llm.tokens_per_second", stats.tokens_per_second)
+    registry.observe("llm.prompt_tokens", stats.prompt_tokens, scale=1)
+    registry.observe("llm.output_tokens", stats.output_tokens, scale=1)
+    for gap in stats.chunk_gaps:
+        registry.observe("llm.chunk_gap_seconds", gap, scale=1e6)
@@ -1,21 +1,32 @@
-
 import time
 import functools
 from modules.logger import Logger
+from modules import metrics
 def timer(func):
     """
     A decorator that prints the execution time of the function it decorates.
+    Every call is also recorded in metrics.registry (calls, errors, latency histogram)
+    unless the registry is disabled.
     """
+    name = func.__qualname__
+
     @functools.wraps(func)  # Preserves the original function's metadata (name, docstring)
     def wrapper(*args, **kwargs):
         start_time = time.perf_counter()  # Start the clock
-        
-        result = func(*args, **kwargs)    # Execute the actual function
-        
+
+        try:
+            result = func(*args, **kwargs)    # Execute the actual function
+        except BaseException:
+            if metrics.registry.enabled:
+                metrics.registry.record(name, time.perf_counter() - start_time, error=True)
+            raise
+
         end_time = time.perf_counter()    # Stop the clock
         execution_time = end_time - start_time
-        
+        if metrics.registry.enabled:
+            metrics.registry.record(name, execution_time)
+
         Logger.info(f"\n--> Function '{func.__name__}' took {execution_time:.4f} seconds to finish.")
         return result
-        
-    return wrapper
\ No newline at end of file
+
+    return wrapper
@@ -0,0 +1,185 @@
+import numpy as np
+
+from modules.knowledge_base import as_formula
+from modules.logic_ast import ATOM, NOT, AND, OR
+
+# a full table over 26 atoms is 2**26 rows = 1M uint64 words (8 MB) per live buffer
+MAX_TABLE_ATOMS = 26
+
+_ALL_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+# bit patterns of the first 6 atoms inside one 64-row word (row r sets atom i to bit i of r)
+_WORD_PATTERNS = [
+    np.uint64(0xAAAAAAAAAAAAAAAA),
+    np.uint64(0xCCCCCCCCCCCCCCCC),
+    np.uint64(0xF0F0F0F0F0F0F0F0),
+    np.uint64(0xFF00FF00FF00FF00),
+    np.uint64(0xFFFF0000FFFF0000),
+    np.uint64(0xFFFFFFFF00000000),
+]
+# number of set bits for every byte value
+_BYTE_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class CompiledFormula:
+    """
+    A formula compiled into a straight-line program of NumPy bitwise operations.
+    Inputs are packed columns: one uint64 array per atom where bit j of the
+    array is the atom's value in row j. Every operation handles 64 rows at once,
+    and buffers are recycled as soon as a subformula has no consumers left.
+    """
+
+    def __init__(self, formula, atoms=None):
+        self.formula = as_formula(formula)
+        used = self.formula.atoms()
+        self.atoms = tuple(atoms) if atoms is not None else tuple(sorted(used))
+        missing = used - set(self.atoms)
+        if missing:
+            raise ValueError(f"atoms missing from the column order: {sorted(missing)}")
+
+        position = {name: index for index, name in enumerate(self.atoms)}
+        nodes = self.formula.subformulas()
+        uses = {}
+        for node in nodes:
+            for child in node.children:
+                uses[child] = uses.get(child, 0) + 1
+
+        # operands are ("atom", column index) or ("reg", register index)
+        self._program = []
+        operand = {}
+        free = []
+        self._registers = 0
+        for node in nodes:
+            if node.op == ATOM:
+                operand[node] = ("atom", position[node.name])
+                continue
+            args = [operand[child] for child in node.children]
+            # take the output register before releasing the children's,
+            # so an operation never writes over one of its own inputs
+            if free:
+                register = free.pop()
+            else:
+                register = self._registers
+                self._registers += 1
+            for child in node.children:
+                uses[child] -= 1
+                kind, index = operand[child]
+                if kind == "reg" and uses[child] == 0:
+                    free.append(index)
+            self._program.append((node.op, register, args))
+            operand[node] = ("reg", register)
+        self._result = operand[self.formula]
+
+    # evaluates packed columns (in self.atoms order); returns a packed uint64 array
+    def evaluate_packed(self, columns) -> np.ndarray:
+        if len(columns) != len(self.atoms):
+            raise ValueError(f"expected {len(self.atoms)} columns, got {len(columns)}")
+        kind, index = self._result
+        if kind == "atom":
+            return np.array(columns[index], dtype=np.uint64, copy=True)
+
+        words = len(columns[0])
+        registers = [np.empty(words, dtype=np.uint64) for _ in range(self._registers)]
+
+        def fetch(arg):
+            kind, index = arg
+            return columns[index] if kind == "atom" else registers[index]
+
+        for op, register, args in self._program:
+            out = registers[register]
+            if op == NOT:
+                np.invert(fetch(args[0]), out=out)
+            elif op == AND:
+                np.bitwise_and(fetch(args[0]), fetch(args[1]), out=out)
+            elif op == OR:
+                np.bitwise_or(fetch(args[0]), fetch(args[1]), out=out)
+            else:  # IMPLY: NOT a OR b
+                np.invert(fetch(args[0]), out=out)
+                np.bitwise_or(out, fetch(args[1]), out=out)
+        return registers[index]
+
+    # evaluates a batch of assignments
+    # assignments is a bool matrix (rows x len(self.atoms)) or a dict atom -> bool array;
+    # atoms left out of the dict are False. Returns one bool per row.
+    def evaluate(self, assignments) -> np.ndarray:
+        columns, rows = pack_assignments(assignments, self.atoms)
+        return unpack_bits(self.evaluate_packed(columns), rows)
+
+
+# packs assignments into uint64 columns; returns (columns, number of rows)
+def pack_assignments(assignments, atoms) -> tuple:
+    if isinstance(assignments, dict):
+        rows = max((len(values) for values in assignments.values()), default=0)
+        matrix = [np.asarray(assignments.get(name, np.zeros(rows, dtype=bool)), dtype=bool)
+                  for name in atoms]
+    else:
+        table = np.asarray(assignments, dtype=bool)
+        if table.ndim != 2 or table.shape[1] != len(atoms):
+            raise ValueError(f"expected a (rows, {len(atoms)}) matrix, got shape {table.shape}")
+        rows = table.shape[0]
+        matrix = [table[:, index] for index in range(len(atoms))]
+
+    padded = -(-rows // 64) * 64
+    columns = []
+    for values in matrix:
+        if len(values) != rows:
+            raise ValueError("all assignment columns must have the same length")
+        bits = np.zeros(padded, dtype=bool)
+        bits[:rows] = values
+        columns.append(np.packbits(bits, bitorder="little").view(np.uint64))
+    return columns, rows
+
+
+# unpacks the first `rows` bits of a packed uint64 array into a bool array
+def unpack_bits(packed: np.ndarray, rows: int) -> np.ndarray:
+    bits = np.unpackbits(packed.view(np.uint8), bitorder="little")
+    return bits[:rows].astype(bool)
+
+
+# packed columns enumerating every assignment of n atoms (row r sets atom i to bit i of r)
+def table_columns(count: int) -> list:
+    if count > MAX_TABLE_ATOMS:
+        raise ValueError(f"full truth tables are limited to {MAX_TABLE_ATOMS} atoms, got {count}")
+    words = max(1, (1 << count) // 64)
+    columns = []
+    for index in range(count):
+        if index < 6:
+            columns.append(np.full(words, _WORD_PATTERNS[index], dtype=np.uint64))
+        else:
+            block = (np.arange(words, dtype=np.uint64) >> np.uint64(index - 6)) & np.uint64(1)
+            columns.append(block * _ALL_ONES)
+    return columns
+
+
+# the full truth table of a formula as a packed uint64 array, plus the atom order used
+def truth_table(formula, atoms=None) -> tuple:
+    compiled = CompiledFormula(formula, atoms)
+    columns = table_columns(len(compiled.atoms))
+    return compiled.evaluate_packed(columns), compiled.atoms
+
+
+# number of satisfying assignments over the formula's atoms (or the given atom list)
+def count_models(formula, atoms=None) -> int:
+    packed, order = truth_table(formula, atoms)
+    rows = 1 << len(order)
+    if rows < 64:
+        # tables under 64 rows only use the low bits of their single word
+        packed = packed & np.uint64((1 << rows) - 1)
+    return int(_BYTE_POPCOUNT[packed.view(np.uint8)].sum(dtype=np.int64))
+
+
+# evaluates every formula against the same batch of assignments
+# returns a bool matrix of shape (len(formulas), rows); the batch is packed once
+def evaluate_many(formulas, assignments, atoms=None) -> np.ndarray:
+    compiled = [CompiledFormula(formula) for formula in formulas]
+    if atoms is None:
+        names = set()
+        for item in compiled:
+            names.update(item.atoms)
+        atoms = tuple(sorted(names))
+    columns, rows = pack_assignments(assignments, atoms)
+    position = {name: index for index, name in enumerate(atoms)}
+    results = np.empty((len(compiled), rows), dtype=bool)
+    for row, item in enumerate(compiled):
+        own = [columns[position[name]] for name in item.atoms]
+        results[row] = unpack_bits(item.evaluate_packed(own), rows)
+    return results